@@ -0,0 +1,648 @@
+#!/usr/bin/env python3
+"""
+Site Builder Benchmarks
+=======================
+
+Measures build_site.py performance so changes can be compared over time.
+
+Benchmarks:
+  thumbnails   Per-image thumbnail time and peak memory, decoding JPEGs at
+               full resolution vs. draft (DCT-domain) reduced scale
+  suite        Cold, warm (no-op) and single-file-change builds of a
+               generated synthetic images/ tree, timed per build stage
+  ordering     Scaling check that manifest ordering (custom order plus
+               hidden images) stays linear up to a 50 000-image project
+  render       Project pages rendered per second by the compiled templates
+               vs. the f-string generator from an earlier git revision
+  memory       Peak memory thumbnailing huge PNG and animated GIF sources
+               against the header estimate and THUMBNAIL_MAX_IMAGE_BYTES
+
+Usage: python3 benchmark_build.py thumbnails [--images images/test] [--widths 320,640] [--json out.json]
+       python3 benchmark_build.py suite [--scale small] [--projects N --images N] [--json out.json] [--compare old.json]
+       python3 benchmark_build.py ordering [--max-images 50000] [--json out.json]
+       python3 benchmark_build.py render [--against REV] [--pages 200] [--json out.json]
+       python3 benchmark_build.py memory [--megapixels 40] [--frames 30] [--json out.json]
+
+Each measurement runs in a freshly forked process so peak RSS reflects
+that image alone. Linux only (uses fork and getrusage); no network access
+is needed.
+"""
+
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+import zlib
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import build_site
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def run_isolated(func, *args):
+    """
+    Run func(*args) in a forked child process
+    Returns (result, wall seconds, peak RSS growth in bytes)
+    """
+    ctx = multiprocessing.get_context('fork')
+    receiver, sender = ctx.Pipe(duplex=False)
+
+    def target():
+        # ru_maxrss is in KB on Linux and starts at the parent's footprint
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        sender.send((result, elapsed, (peak - baseline) * 1024))
+
+    process = ctx.Process(target=target)
+    process.start()
+    # Only the child may hold the sending end, so its death reads as EOF here
+    sender.close()
+    try:
+        outcome = receiver.recv()
+    except EOFError:
+        process.join()
+        raise RuntimeError(f"{func.__name__} failed in the child process (exit code {process.exitcode})")
+    process.join()
+    return outcome
+
+
+def find_images(folder):
+    """Benchmarkable images in a folder, sorted by name"""
+    return sorted(p for p in Path(folder).iterdir()
+                  if p.is_file() and p.suffix in build_site.IMAGE_EXTENSIONS)
+
+
+def timed_call(func, *args):
+    """Wall seconds for one call of func"""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def point_build_at(root):
+    """
+    Re-point every build_site path setting from the repo to root
+    Only call this in a forked child; the parent keeps the real paths.
+    The page templates are part of the builder, not the site, so they stay.
+    """
+    original = build_site.BASE_DIR
+    for name, value in list(vars(build_site).items()):
+        if name == 'TEMPLATES_BASE':
+            continue
+        if isinstance(value, Path) and (value == original or original in value.parents):
+            setattr(build_site, name, Path(root) / value.relative_to(original))
+
+
+def write_results(results, json_path):
+    """Save benchmark results for later comparison"""
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {json_path}")
+
+# ============================================================================
+# THUMBNAILS: FULL DECODE VS DRAFT DECODE
+# ============================================================================
+
+def thumbnail_once(image_path, out_dir, draft, widths, formats):
+    """Generate one image's thumbnails with draft decoding on or off"""
+    build_site.JPEG_DRAFT_DECODE = draft
+    return build_site.generate_thumbnail(image_path, Path(out_dir) / f"{image_path.stem}.jpg",
+                                         widths=widths, formats=formats) is not None
+
+
+def bench_thumbnails(args):
+    """Compare per-image time and memory with and without JPEG draft decoding"""
+    images = find_images(args.images)
+    if not images:
+        print(f"No images found in {args.images}")
+        return 1
+
+    # Draft decoding can only drop to a scale that still covers the widest output
+    # (build_site lowers a top rung that just misses one, see JPEG_DRAFT_SNAP)
+    formats = args.formats.split(',') if args.formats else ['jpeg']
+    widths = tuple(int(w) for w in args.widths.split(',')) if args.widths else build_site.THUMBNAIL_WIDTHS
+    print(f"Thumbnail benchmark: {len(images)} images from {args.images}")
+    print(f"  widths: {', '.join(map(str, widths))}; formats: {', '.join(formats)}\n")
+    print(f"  {'image':<34} {'MP':>5} {'decoded':>8} {'full s':>8} {'draft s':>8} {'full MB':>8} {'draft MB':>9}")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        for image_path in images:
+            with build_site.Image.open(image_path) as img:
+                megapixels = img.width * img.height / 1e6
+                build_site.JPEG_DRAFT_DECODE = True
+                decoded = build_site.decode_cost(img, widths=widths)[0] / 1e6
+
+            row = {"image": image_path.name, "megapixels": round(megapixels, 1),
+                   "draft_megapixels": round(decoded, 1)}
+            for mode, draft in (('full', False), ('draft', True)):
+                ok, elapsed, peak = run_isolated(thumbnail_once, image_path, out_dir, draft, widths, formats)
+                row[mode] = {"ok": ok, "seconds": round(elapsed, 4), "peak_rss_bytes": peak}
+            rows.append(row)
+
+            print(f"  {image_path.name[:34]:<34} {megapixels:>5.1f} {decoded:>8.1f} "
+                  f"{row['full']['seconds']:>8.3f} {row['draft']['seconds']:>8.3f} "
+                  f"{row['full']['peak_rss_bytes'] / 2**20:>8.1f} {row['draft']['peak_rss_bytes'] / 2**20:>9.1f}")
+
+    total = {mode: sum(row[mode]['seconds'] for row in rows) for mode in ('full', 'draft')}
+    peak = {mode: max(row[mode]['peak_rss_bytes'] for row in rows) for mode in ('full', 'draft')}
+    print(f"\n  Total time: {total['full']:.2f}s full vs {total['draft']:.2f}s draft "
+          f"({total['full'] / max(total['draft'], 1e-9):.2f}x)")
+    print(f"  Worst peak RSS: {peak['full'] / 2**20:.1f} MB full vs {peak['draft'] / 2**20:.1f} MB draft")
+    reduced = sum(1 for row in rows if row['draft_megapixels'] < row['megapixels'])
+    print(f"  Draft decoding reduced {reduced} of {len(rows)} images: "
+          f"{sum(row['megapixels'] for row in rows):.0f} -> {sum(row['draft_megapixels'] for row in rows):.0f} MP decoded")
+
+    write_results({"benchmark": "thumbnails", "images": str(args.images), "formats": formats,
+                   "widths": list(widths), "rows": rows}, args.json)
+    return 0
+
+# ============================================================================
+# SUITE: SYNTHETIC TREES, COLD / WARM / SINGLE-CHANGE BUILDS
+# ============================================================================
+
+# (projects, images) per --scale preset
+SUITE_SCALES = {
+    'tiny': (10, 100),
+    'small': (10, 1000),
+    'medium': (100, 10000),
+    'large': (1000, 100000),
+}
+SUITE_FORMATS = ('jpeg', 'png', 'gif', 'webp')
+SUITE_RESOLUTIONS = ((640, 480), (1600, 1200), (4032, 3024))
+# Distinct source images encoded per format/resolution; files are copies of these
+SUITE_VARIANTS = 4
+
+
+def synthetic_image(size, seed):
+    """A deterministic gradient-plus-noise image, so encoders do realistic work"""
+    rng = random.Random(seed)
+    # Noise is generated at quarter size and scaled up, which is much quicker
+    small = (max(1, size[0] // 4), max(1, size[1] // 4))
+    noise = build_site.Image.effect_noise(small, 40).convert('RGB')
+    gradient = build_site.Image.linear_gradient('L').resize(small).convert('RGB')
+    tint = build_site.Image.new('RGB', small, tuple(rng.randrange(256) for _ in range(3)))
+    img = build_site.Image.blend(build_site.Image.blend(gradient, tint, 0.5), noise, 0.3)
+    return img.resize(size, build_site.Image.Resampling.BILINEAR)
+
+
+def save_synthetic(img, path, fmt):
+    """Save in one of the formats the builder accepts"""
+    # Favour fast encoder settings; generating the tree is not what is measured
+    if fmt == 'gif':
+        img = img.convert('P', palette=build_site.Image.Palette.WEB)
+    options = {'png': {'compress_level': 1}, 'webp': {'method': 0}}.get(fmt, {})
+    img.save(path, {'jpeg': 'JPEG', 'png': 'PNG', 'gif': 'GIF', 'webp': 'WEBP'}[fmt], **options)
+
+
+def make_synthetic_tree(root, projects, images, formats=SUITE_FORMATS,
+                        resolutions=SUITE_RESOLUTIONS, seed=0):
+    """
+    Lay out images/ under root with images spread evenly over projects
+    Every tenth project is nested one level down, as category/project
+    Returns the list of image paths written
+    """
+    rng = random.Random(seed)
+    sources = Path(root) / '.sources'
+    sources.mkdir(parents=True, exist_ok=True)
+    pool = []
+    for fmt in formats:
+        for size in resolutions:
+            for variant in range(SUITE_VARIANTS):
+                path = sources / f"{fmt}-{size[0]}x{size[1]}-{variant}.{'jpg' if fmt == 'jpeg' else fmt}"
+                save_synthetic(synthetic_image(size, rng.random()), path, fmt)
+                pool.append(path)
+
+    written = []
+    for number in range(images):
+        project = number % projects
+        folder = f"category-{project // 10:03d}/project-{project:04d}" if project % 10 == 9 else f"project-{project:04d}"
+        source = pool[rng.randrange(len(pool))]
+        target = Path(root) / 'images' / folder / f"img-{number:06d}{source.suffix}"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source, target)
+        written.append(target)
+    return written
+
+
+def timed(stages, name, func, *args, **kwargs):
+    """Call func, adding its wall time to stages[name]"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    stages[name] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def build_stages(root, jobs):
+    """
+    Run each build stage once against the tree at root (in a forked child)
+    Returns seconds per stage, plus project and image counts
+    """
+    point_build_at(root)
+    stages = {}
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for folder in (build_site.GEN_BASE, build_site.THUMBNAILS_BASE, build_site.MANIFESTS_BASE):
+            folder.mkdir(parents=True, exist_ok=True)
+        metadata_config = build_site.load_metadata()
+        build_cache = timed(stages, 'load cache', build_site.load_build_cache)
+        build_site.build_report.reset()
+        discovered = timed(stages, 'galleries', build_site.build_galleries, build_site.IMAGES_BASE,
+                           metadata_config, build_cache=build_cache, jobs=jobs)
+        start = time.perf_counter()
+        build_site.generate_site_index(discovered, metadata_config, build_cache)
+        build_site.generate_index_html(discovered, metadata_config, build_cache)
+        build_site.generate_site_config(metadata_config, build_cache)
+        stages['site pages'] = round(time.perf_counter() - start, 4)
+        timed(stages, 'save cache', build_site.save_build_cache, build_cache)
+    return {"stages": stages, "projects": len(discovered),
+            "images": sum(info['image_count'] for info in discovered.values()),
+            # Where the streamed galleries stage spent its time (threads and workers summed)
+            "galleries_breakdown": {name: round(seconds, 4)
+                                    for name, seconds in build_site.build_report.breakdown.items()},
+            # Largest thumbnail worker, once the pool has been shut down and reaped
+            "peak_worker_rss_bytes": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024}
+
+
+def change_one_image(paths, seed):
+    """Re-encode one existing image with new pixels, as an edit would"""
+    target = paths[len(paths) // 2]
+    with build_site.Image.open(target) as img:
+        size, fmt = img.size, img.format.lower()
+    save_synthetic(synthetic_image(size, seed), target, fmt)
+    return target
+
+
+def compare_results(results, baseline_path):
+    """Print each scenario/stage time against an earlier results file"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} (ratio > 1 is slower):\n")
+    settings = ('projects', 'images', 'source_formats', 'resolutions', 'thumbnail_formats', 'jobs')
+    differing = [key for key in settings if baseline.get(key) != results[key]]
+    if differing:
+        print(f"  Note: runs differ in {', '.join(differing)}\n")
+    for scenario, outcome in results['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(scenario)
+        if not before:
+            continue
+        for stage, seconds in outcome['stages'].items():
+            old = before['stages'].get(stage)
+            if old is None:
+                continue
+            ratio = seconds / old if old else float('inf') if seconds else 1.0
+            flag = '  <-- regression' if ratio > 1.2 and seconds - old > 0.05 else ''
+            print(f"  {scenario:<8} {stage:<14} {old:>9.3f}s -> {seconds:>9.3f}s  {ratio:>5.2f}x{flag}")
+
+
+def bench_suite(args):
+    """Cold, warm and single-change builds of a synthetic tree"""
+    projects, images = SUITE_SCALES[args.scale]
+    projects = args.projects or projects
+    images = args.images or images
+    formats = tuple(args.formats.split(',')) if args.formats else SUITE_FORMATS
+    resolutions = (tuple(tuple(int(n) for n in size.split('x')) for size in args.resolutions.split(','))
+                   if args.resolutions else SUITE_RESOLUTIONS)
+    # Output formats default to JPEG only; AVIF encoding dominates everything else
+    thumbnail_formats = tuple(args.thumbnail_formats.split(','))
+    build_site.THUMBNAIL_FORMATS = thumbnail_formats
+
+    root = Path(tempfile.mkdtemp(prefix='site-bench-', dir=args.workdir))
+    try:
+        print(f"Suite benchmark: {images} images in {projects} projects under {root}")
+        print(f"  sources: {', '.join(formats)} at {', '.join(f'{w}x{h}' for w, h in resolutions)}; "
+              f"thumbnails: {', '.join(thumbnail_formats)}; jobs: {args.jobs}\n")
+        start = time.perf_counter()
+        paths = make_synthetic_tree(root, projects, images, formats, resolutions, seed=args.seed)
+        print(f"  Generated tree in {time.perf_counter() - start:.1f}s\n")
+
+        scenarios = {}
+        for scenario in ('cold', 'warm', 'change'):
+            if scenario == 'change':
+                changed = change_one_image(paths, args.seed + 1)
+                print(f"  Changed {changed.relative_to(root)}")
+            outcome, elapsed, peak = run_isolated(build_stages, root, args.jobs)
+            outcome.update(total_seconds=round(elapsed, 4), peak_rss_bytes=peak)
+            scenarios[scenario] = outcome
+
+        stage_names = list(scenarios['cold']['stages'])
+        print(f"\n  {'stage':<14}" + ''.join(f"{name:>10}" for name in scenarios))
+        for stage in stage_names:
+            print(f"  {stage:<14}" + ''.join(f"{outcome['stages'][stage]:>9.3f}s" for outcome in scenarios.values()))
+        print(f"  {'total':<14}" + ''.join(f"{outcome['total_seconds']:>9.3f}s" for outcome in scenarios.values()))
+        print(f"  {'peak RSS':<14}" + ''.join(f"{outcome['peak_rss_bytes'] / 2**20:>7.1f} MB" for outcome in scenarios.values()))
+        print(f"  {'worker RSS':<14}" + ''.join(f"{outcome['peak_worker_rss_bytes'] / 2**20:>7.1f} MB" for outcome in scenarios.values()))
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    results = {"benchmark": "suite", "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+               "projects": projects, "images": images, "source_formats": list(formats),
+               "resolutions": [list(size) for size in resolutions],
+               "thumbnail_formats": list(thumbnail_formats), "jobs": args.jobs, "scenarios": scenarios}
+    if args.compare:
+        compare_results(results, args.compare)
+    write_results(results, args.json)
+    return 0
+
+# ============================================================================
+# ORDERING: LINEAR SCALING OF MANIFEST ORDER / HIDDEN FILTERING
+# ============================================================================
+
+def synthetic_ordering(count, seed=0):
+    """
+    A project of count images with a shuffled custom order covering 90% of
+    them (the rest are 'new'), a few stale entries and 5% hidden
+    """
+    rng = random.Random(seed)
+    images = [f"IMG_{number:06d}.jpg" for number in range(count)]
+    custom_order = rng.sample(images, int(count * 0.9)) + [f"deleted_{n}.jpg" for n in range(count // 100)]
+    hidden = rng.sample(images, count // 20)
+    return images, custom_order, hidden
+
+
+def time_manifest(root, count):
+    """Seconds to order and write one count-image manifest (in a forked child)"""
+    point_build_at(root)
+    images, custom_order, hidden = synthetic_ordering(count)
+    info = {"rel_path": "synthetic", "images": images, "image_count": count, "media": {}}
+    start = time.perf_counter()
+    build_site.generate_manifest('synthetic', info, {'synthetic': custom_order}, {'synthetic': hidden})
+    return time.perf_counter() - start
+
+
+def bench_ordering(args):
+    """Check order_images() and generate_manifest() scale linearly with gallery size"""
+    sizes = []
+    count = args.max_images
+    while count >= 1000:
+        sizes.insert(0, count)
+        count //= 2
+
+    print(f"Ordering benchmark: {', '.join(map(str, sizes))} images\n")
+    print(f"  {'images':>8} {'order s':>9} {'us/image':>9} {'manifest s':>11}")
+    rows = []
+    with tempfile.TemporaryDirectory() as root:
+        for count in sizes:
+            images, custom_order, hidden = synthetic_ordering(count)
+            # Best of a few runs, to keep timer noise out of the ratio
+            best = min(timed_call(build_site.order_images, images, custom_order, hidden)
+                       for _ in range(args.repeat))
+            manifest_seconds, _, _ = run_isolated(time_manifest, root, count)
+            rows.append({"images": count, "order_seconds": round(best, 6),
+                         "manifest_seconds": round(manifest_seconds, 4)})
+            print(f"  {count:>8} {best:>9.4f} {best / count * 1e6:>9.3f} {manifest_seconds:>11.3f}")
+
+    # Linear means per-image cost stays flat; quadratic would grow with size
+    growth = (rows[-1]['order_seconds'] / rows[-1]['images']) / (rows[0]['order_seconds'] / rows[0]['images'])
+    linear = growth < args.tolerance
+    print(f"\n  Per-image cost grew {growth:.2f}x from {rows[0]['images']} to {rows[-1]['images']} images "
+          f"({'linear' if linear else 'NOT linear'}, tolerance {args.tolerance}x)")
+
+    write_results({"benchmark": "ordering", "rows": rows, "per_image_growth": round(growth, 3),
+                   "linear": linear}, args.json)
+    return 0 if linear else 1
+
+# ============================================================================
+# RENDER: COMPILED TEMPLATES VS F-STRINGS
+# ============================================================================
+
+def baseline_revision():
+    """The commit before templates/ was added, i.e. the last f-string generator"""
+    added = subprocess.run(['git', 'log', '--diff-filter=A', '--format=%H', '--', 'templates/project.html'],
+                           cwd=build_site.BASE_DIR, capture_output=True, text=True, check=True).stdout.split()
+    # Not committed yet: HEAD still has the f-strings
+    return f"{added[-1]}^" if added else 'HEAD'
+
+
+def load_revision(revision, workdir):
+    """Import build_site.py as it was at a git revision, as a separate module"""
+    source = subprocess.run(['git', 'show', f'{revision}:build_site.py'], cwd=build_site.BASE_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    path = Path(workdir) / 'build_site_baseline.py'
+    path.write_text(source, encoding='utf-8')
+    spec = importlib.util.spec_from_file_location('build_site_baseline', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_page(number, images):
+    """
+    Arguments for generate_project_page() for one synthetic project
+    The manifest goes in build_site's registry, and in info['manifest'] where
+    older revisions looked for it
+    """
+    slug = f"project-{number}"
+    filenames = [f"IMG_{n:04d}.jpg" for n in range(images)]
+    media = {name: {"widths": [320, 640], "formats": ["webp", "jpeg"], "width": 640, "height": 480,
+                    "color": "#808080", "version": "0123abcd"} for name in filenames}
+    manifest = build_site.manifest_registry[slug] = {"images": filenames, "media": media, "sheets": []}
+    info = {"rel_path": slug, "image_count": images, "manifest": manifest}
+    metadata = {"title": f"Project {number} & 'friends'", "description": "A <synthetic> project",
+                "year": "2025", "tags": "Wood • Metal"}
+    return slug, info, metadata
+
+
+def pages_per_second(modules, pages, repeat):
+    """
+    Best-of-repeat rate of generate_project_page() over the pages, for each module
+    The modules take turns within each run, so a noisy moment costs them alike
+    """
+    def render_all(module):
+        for slug, info, metadata in pages:
+            module.generate_project_page(slug, info, metadata, 'default', 'default')
+    timings = {name: [] for name in modules}
+    for _ in range(repeat):
+        for name, module in modules.items():
+            timings[name].append(timed_call(render_all, module))
+    return {name: len(pages) / min(runs) for name, runs in timings.items()}
+
+
+def bench_render(args):
+    """Compare page generation through the compiled templates with the old f-strings"""
+    revision = args.against or baseline_revision()
+    pages = [synthetic_page(number, args.images) for number in range(args.pages)]
+
+    start = time.perf_counter()
+    build_site.get_template('project.html')
+    compile_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as workdir:
+        baseline = load_revision(revision, workdir)
+        print(f"Render benchmark: {args.pages} project pages of {args.images} images, "
+              f"templates vs f-strings at {revision}\n")
+        with redirect_stdout(open(os.devnull, 'w')):
+            rates = pages_per_second({"templates": build_site, "fstrings": baseline}, pages, args.repeat)
+
+    print(f"  {'generator':<10} {'pages/s':>10}")
+    for name, rate in rates.items():
+        print(f"  {name:<10} {rate:>10.0f}")
+    ratio = rates['templates'] / rates['fstrings']
+    print(f"\n  Templates compiled once in {compile_seconds * 1000:.1f} ms; "
+          f"rendering runs at {ratio:.2f}x the f-string rate")
+
+    write_results({"benchmark": "render", "against": revision, "pages": args.pages, "images": args.images,
+                   "compile_seconds": round(compile_seconds, 6),
+                   "pages_per_second": {name: round(rate, 1) for name, rate in rates.items()},
+                   "ratio": round(ratio, 3)}, args.json)
+    return 0
+
+# ============================================================================
+# MEMORY: HUGE AND ANIMATED SOURCES
+# ============================================================================
+
+def write_streamed_png(path, width, height):
+    """An RGB gradient PNG written row by row, so a huge source never sits in memory"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    row = b'\0' + (bytes(range(256)) * (width * 3 // 256 + 1))[:width * 3]
+    compressor = zlib.compressobj(1)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        for _ in range(height):
+            data = compressor.compress(row)
+            if data:
+                f.write(chunk(b'IDAT', data))
+        f.write(chunk(b'IDAT', compressor.flush()) + chunk(b'IEND', b''))
+
+
+def write_animated_gif(path, size, frames):
+    """A palette GIF with frames distinct frames (run in a forked child)"""
+    images = [build_site.Image.new('P', size, color=n % 256) for n in range(frames)]
+    images[0].save(path, save_all=True, append_images=images[1:], duration=100, loop=0)
+
+
+def memory_once(image_path, out_dir):
+    """Thumbnail one source; returns 'ok', 'skipped' or 'failed'"""
+    result = build_site.generate_thumbnail(image_path, Path(out_dir) / f"{image_path.stem}.jpg",
+                                           formats=['jpeg'])
+    return 'failed' if result is None else 'skipped' if 'skipped' in result else 'ok'
+
+
+def bench_memory(args):
+    """Check huge sources stay within the per-image limit, or are skipped after reading only the header"""
+    limit = build_site.THUMBNAIL_MAX_IMAGE_BYTES
+    side = int((args.megapixels * 1e6) ** 0.5)
+    # Just over the limit at RGB's 8 bytes a pixel (still under Pillow's own bomb check)
+    over = int((limit * 1.2 / 8) ** 0.5)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        workdir = Path(workdir)
+        sources = [('large.png', side, side), ('oversized.png', over, over)]
+        for name, width, height in sources:
+            write_streamed_png(workdir / name, width, height)
+        run_isolated(write_animated_gif, workdir / 'animated.gif', (2000, 1500), args.frames)
+
+        print(f"Memory benchmark: per-image limit {build_site.format_bytes(limit)}\n")
+        print(f"  {'source':<14} {'size':>12} {'estimate MB':>12} {'peak MB':>9} {'s':>7}  result")
+        rows = []
+        out_dir = workdir / 'out'
+        for name in ('large.png', 'oversized.png', 'animated.gif'):
+            path = workdir / name
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', build_site.Image.DecompressionBombWarning)
+                with build_site.Image.open(path) as img:
+                    size = img.size
+                    _, estimate = build_site.decode_cost(img)
+            outcome, elapsed, peak = run_isolated(memory_once, path, out_dir)
+            rows.append({"source": name, "size": list(size), "estimate_bytes": estimate,
+                         "peak_rss_bytes": peak, "seconds": round(elapsed, 4), "result": outcome})
+            print(f"  {name:<14} {size[0]:>5}x{size[1]:<6} {estimate / 2**20:>12.1f} {peak / 2**20:>9.1f} "
+                  f"{elapsed:>7.3f}  {outcome}")
+
+    # Skipping must happen before decoding: a few MB at most
+    within = all(row['peak_rss_bytes'] <= limit for row in rows)
+    skipped_early = all(row['peak_rss_bytes'] < 64 * 2**20 for row in rows if row['result'] == 'skipped')
+    expected = [row['result'] for row in rows] == ['ok', 'skipped', 'ok']
+    passed = within and skipped_early and expected
+    print(f"\n  {'PASS' if passed else 'FAIL'}: every source within the limit ({within}), "
+          f"oversized skipped before decoding ({skipped_early}), results as expected ({expected})")
+
+    write_results({"benchmark": "memory", "limit_bytes": limit, "rows": rows, "passed": passed}, args.json)
+    return 0 if passed else 1
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for build_site.py")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    thumbs = subparsers.add_parser('thumbnails', help="full vs draft JPEG decoding per image")
+    thumbs.add_argument('--images', type=Path, default=build_site.IMAGES_BASE / 'test',
+                        help="folder of sample images (default: images/test)")
+    thumbs.add_argument('--widths', help="comma separated responsive widths (default: THUMBNAIL_WIDTHS)")
+    thumbs.add_argument('--formats', help="comma separated output formats (default: jpeg)")
+    thumbs.add_argument('--json', help="write results to this JSON file")
+    thumbs.set_defaults(func=bench_thumbnails)
+
+    suite = subparsers.add_parser('suite', help="cold/warm/single-change builds of a synthetic tree")
+    suite.add_argument('--scale', choices=SUITE_SCALES, default='tiny',
+                       help="preset tree size: " + ', '.join(f"{name}={p} projects/{i} images"
+                                                            for name, (p, i) in SUITE_SCALES.items()))
+    suite.add_argument('--projects', type=int, help="override the preset's project count")
+    suite.add_argument('--images', type=int, help="override the preset's image count")
+    suite.add_argument('--formats', help=f"comma separated source formats (default: {','.join(SUITE_FORMATS)})")
+    suite.add_argument('--resolutions', help="comma separated WxH source sizes (default: "
+                                             + ','.join(f'{w}x{h}' for w, h in SUITE_RESOLUTIONS) + ")")
+    suite.add_argument('--thumbnail-formats', default='jpeg',
+                       help="comma separated output formats (default: jpeg)")
+    suite.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                       help="worker processes for thumbnails (default: CPU count)")
+    suite.add_argument('--seed', type=int, default=0, help="random seed for the generated tree")
+    suite.add_argument('--workdir', help="where to create the temporary tree (default: system temp)")
+    suite.add_argument('--keep', action='store_true', help="keep the generated tree afterwards")
+    suite.add_argument('--json', help="write results to this JSON file")
+    suite.add_argument('--compare', help="earlier --json results to compare against")
+    suite.set_defaults(func=bench_suite)
+
+    ordering = subparsers.add_parser('ordering', help="linear scaling of manifest ordering up to 50k images")
+    ordering.add_argument('--max-images', type=int, default=50000,
+                          help="largest synthetic project; sizes halve down to 1000 (default: 50000)")
+    ordering.add_argument('--repeat', type=int, default=5, help="runs per size, best kept (default: 5)")
+    ordering.add_argument('--tolerance', type=float, default=3.0,
+                          help="max per-image cost growth still counted as linear (default: 3.0)")
+    ordering.add_argument('--json', help="write results to this JSON file")
+    ordering.set_defaults(func=bench_ordering)
+
+    render = subparsers.add_parser('render', help="project pages/s: compiled templates vs f-strings")
+    render.add_argument('--against', help="git revision with the f-string generator "
+                                          "(default: the commit before templates/ was added)")
+    render.add_argument('--pages', type=int, default=200, help="synthetic project pages (default: 200)")
+    render.add_argument('--images', type=int, default=40, help="images per page (default: 40)")
+    render.add_argument('--repeat', type=int, default=5, help="runs, best kept (default: 5)")
+    render.add_argument('--json', help="write results to this JSON file")
+    render.set_defaults(func=bench_render)
+
+    memory = subparsers.add_parser('memory', help="peak memory for huge PNG and animated GIF sources")
+    memory.add_argument('--megapixels', type=float, default=40,
+                        help="size of the PNG that should fit the per-image limit (default: 40)")
+    memory.add_argument('--frames', type=int, default=30, help="frames in the animated GIF (default: 30)")
+    memory.add_argument('--json', help="write results to this JSON file")
+    memory.set_defaults(func=bench_memory)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
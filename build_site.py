@@ -10,17 +10,61 @@ This script orchestrates the entire website build process:
 4. Generates project gallery pages
 5. Creates site index
 
-Usage: python3 build_site.py
+Steps 1-4 are streamed: each folder gets its manifest and page as soon as
+its thumbnails are done, while discovery and thumbnailing carry on.
+
+Usage: python3 build_site.py [--jobs N] [--force] [--profile]
+
+Every build writes per-stage timings to gen/build-report.json.
 
 After adding/removing images, just run this script and everything updates!
+Outputs whose inputs have not changed since the last build are left alone.
 """
 
+import argparse
+import ast
+import base64
+import builtins
+import cProfile
+import ctypes
+import ctypes.util
+import errno
+import gzip
+import hashlib
+import io
 import json
-import shutil
+import os
+import re
+import select
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
 from datetime import datetime
+from html import escape as html_escape
 from PIL import Image
 import sys
+import warnings
+from urllib.parse import quote
+from PIL import ExifTags, ImageOps, features
+
+try:
+    from PIL import ImageCms  # needs Pillow built with littlecms
+except ImportError:
+    ImageCms = None
+
+try:
+    import brotli  # optional; only .gz siblings are written without it
+except ImportError:
+    brotli = None
+
+try:
+    import resource  # Unix only; peak RSS is simply not reported elsewhere
+except ImportError:
+    resource = None
 
 # ============================================================================
 # CONFIGURATION
@@ -35,11 +79,126 @@ PROJECTS_BASE = BASE_DIR / 'projects'
 METADATA_FILE = BASE_DIR / 'projects-metadata.json'
 IMAGE_ORDER_FILE = BASE_DIR / 'image-orders.json'
 HIDDEN_IMAGES_FILE = BASE_DIR / 'hidden-images.json'
+BUILD_CACHE_FILE = GEN_BASE / '.build-cache.json'
+BUILD_REPORT_FILE = GEN_BASE / 'build-report.json'
+BUILD_PROFILE_FILE = GEN_BASE / 'build-profile.pstats'
+ASSETS_BASE = GEN_BASE / 'assets'
+ASSET_MAP_FILE = GEN_BASE / 'asset-map.json'
+SHEETS_BASE = GEN_BASE / 'sheets'
+TEMPLATES_BASE = BASE_DIR / 'templates'
 
 THUMBNAIL_SIZE = (800, 800)
 THUMBNAIL_QUALITY = 75
 
-ASSET_VERSION = datetime.now().strftime("%Y%m%d")
+# Responsive widths generated next to each thumbnail as {stem}-{width}w.jpg
+# (never upscaled; smaller originals top out at their own width). The widest
+# layout slot is a 50vw project card, so 1600px covers it at 2x density; the
+# lightbox opens the original. Every rung is committed and published with the
+# site, in every format, so add rungs sparingly.
+THUMBNAIL_WIDTHS = (320, 640, 1024, 1600)
+
+# Encodings written for every responsive width, in <picture> preference order.
+# JPEG is always written as the fallback; formats the installed Pillow cannot
+# encode are skipped. AVIF runs at encoder speed 9: about 5% bigger files than
+# the default speed 6, but 10-20x faster, which brings it to WebP's cost.
+THUMBNAIL_FORMATS = ('avif', 'webp', 'jpeg')
+FORMAT_ENCODERS = {
+    'avif': {'format': 'AVIF', 'ext': 'avif', 'mime': 'image/avif', 'options': {'quality': 50, 'speed': 9}},
+    'webp': {'format': 'WEBP', 'ext': 'webp', 'mime': 'image/webp', 'options': {'quality': 70, 'method': 4}},
+    'jpeg': {'format': 'JPEG', 'ext': 'jpg', 'mime': 'image/jpeg', 'options': {'quality': THUMBNAIL_QUALITY, 'optimize': True}},
+}
+
+# Tiny blurred preview (longest side in px) inlined as a data URI, shown with
+# the image's average colour while the real thumbnail loads
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 40
+
+# Pack each gallery's grid previews into a few contact sheets
+# (gen/sheets/{slug}/0.jpg, ...) so the grid paints from one or two requests;
+# an image's own thumbnail is only fetched once the visitor interacts with it
+CONTACT_SHEETS = True
+CONTACT_SHEET_TILE = 240        # square tile edge in px
+CONTACT_SHEET_COLUMNS = 8
+CONTACT_SHEET_TILES = 64        # tiles per sheet
+CONTACT_SHEET_QUALITY = 70
+# Smaller galleries just load their few thumbnails
+CONTACT_SHEET_MIN_IMAGES = 4
+
+# <img sizes> hints matching the gallery grid and project card columns in styles.css
+GALLERY_IMAGE_SIZES = "(max-width: 768px) 34vw, (max-width: 1200px) 33vw, 400px"
+CARD_IMAGE_SIZES = "(max-width: 768px) 100vw, 50vw"
+
+# Let libjpeg decode straight to 1/2, 1/4 or 1/8 scale when that still covers
+# the largest output, instead of decoding every camera JPEG at full resolution
+JPEG_DRAFT_DECODE = True
+# A top rung at most this fraction above such a reduced width is lowered to it
+# (e.g. 1600 -> 1536 for a 3072px portrait), so the decode stays reduced
+JPEG_DRAFT_SNAP = 0.1
+# Formats Image.draft() can shrink while decoding (MPO is a multi-frame JPEG)
+DRAFT_FORMATS = {'JPEG', 'MPO'}
+# Resize via a cheap integer reduce() first when shrinking by more than this factor
+RESIZE_REDUCING_GAP = 3.0
+
+# Memory guards for thumbnailing, checked against an estimate made from each
+# image's header before any pixels are decoded (see decode_cost()): an image
+# needing more than THUMBNAIL_MAX_IMAGE_BYTES is skipped with a warning, and
+# worker processes are only handed images while the estimates for everything
+# in flight fit THUMBNAIL_MEMORY_BUDGET (None for either: no limit)
+THUMBNAIL_MAX_IMAGE_BYTES = 1 << 30
+THUMBNAIL_MEMORY_BUDGET = 2 << 30
+# Source formats whose extra frames are an animation (thumbnailed from frame one)
+ANIMATED_FORMATS = {'GIF', 'WEBP', 'PNG'}
+
+# Convert images with an embedded ICC profile to sRGB at build time, so
+# thumbnails can drop the profile (when off, the profile is copied instead)
+CONVERT_TO_SRGB = True
+
+# Bump when the cache layout changes; older caches are discarded
+BUILD_CACHE_VERSION = 3
+
+# Bump when generated pages or manifests change shape so they get rebuilt
+TEMPLATE_VERSION = 10
+
+# Threads rendering/writing project pages (None: ThreadPoolExecutor's default)
+PAGE_WRITE_THREADS = None
+
+# Embed each project's manifest in its page, so the gallery can render without
+# first fetching gen/manifests/{slug}.json (which is still written for the admin panel)
+INLINE_MANIFESTS = True
+
+# Galleries with more images than this also get their manifest split into
+# gen/manifests/{slug}/0.json, 1.json, ... plus an index.json; the page then
+# carries only the first chunk and fetches the rest as the visitor scrolls
+# (None: never split)
+MANIFEST_CHUNK_SIZE = 120
+
+# CSS/JS (globs relative to BASE_DIR) copied to gen/assets/ under content-hashed
+# names, so they can be served with Cache-Control: immutable
+ASSET_PATTERNS = ('*.css', '*.js', 'layouts/*.css', 'themes/*.css')
+ASSET_HASH_LENGTH = 8
+
+# Inline the CSS rules a page needs for its first screen in <head> and load the
+# full stylesheets without blocking rendering
+INLINE_CRITICAL_CSS = True
+# How much of the <body> markup (in characters) counts as above the fold
+CRITICAL_FOLD_CHARS = 8000
+
+# Text artifacts (globs relative to BASE_DIR) that get precompressed .gz/.br
+# siblings, so a server or CDN can send them without compressing per request
+PRECOMPRESS = True
+PRECOMPRESS_PATTERNS = (
+    'index.html', 'projects/*.html', 'gen/manifests/*.json', 'gen/manifests/*/*.json', 'gen/site-index.json',
+    'site-config.json', 'gen/asset-map.json', 'gen/assets/**/*.css', 'gen/assets/**/*.js'
+)
+# Smaller files gain nothing worth the extra request-time lookup
+PRECOMPRESS_MIN_BYTES = 256
+
+# --watch: a burst of changes (e.g. a folder being copied in) is rebuilt once
+# it has been quiet for WATCH_DEBOUNCE seconds, or after WATCH_MAX_DELAY at
+# the latest; WATCH_POLL_INTERVAL applies where inotify is unavailable
+WATCH_DEBOUNCE = 0.05
+WATCH_MAX_DELAY = 2.0
+WATCH_POLL_INTERVAL = 0.5
 
 # Folders to exclude from processing
 EXCLUDE_FOLDERS = {'thumbnails', 'gen', '.git', '__pycache__', 'venv', 'node_modules', '.DS_Store'}
@@ -57,6 +216,7 @@ def load_metadata():
         print(f"Warning: {METADATA_FILE} not found. Using defaults.")
         return {"projects": {}, "defaults": {}}
 
+    build_report.count_read(METADATA_FILE.stat().st_size)
     with open(METADATA_FILE, 'r') as f:
         return json.load(f)
 
@@ -66,6 +226,7 @@ def load_image_orders():
     if not IMAGE_ORDER_FILE.exists():
         return {}
 
+    build_report.count_read(IMAGE_ORDER_FILE.stat().st_size)
     with open(IMAGE_ORDER_FILE, 'r') as f:
         return json.load(f)
 
@@ -75,10 +236,758 @@ def load_hidden_images():
     if not HIDDEN_IMAGES_FILE.exists():
         return {}
 
+    build_report.count_read(HIDDEN_IMAGES_FILE.stat().st_size)
     with open(HIDDEN_IMAGES_FILE, 'r') as f:
         return json.load(f)
 
 
+# ============================================================================
+# BUILD CACHE
+# ============================================================================
+
+def load_build_cache():
+    """Load the persistent build cache, starting fresh if missing or outdated"""
+    if BUILD_CACHE_FILE.exists():
+        try:
+            with open(BUILD_CACHE_FILE, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring unreadable build cache ({e})")
+        else:
+            if cache.get('version') == BUILD_CACHE_VERSION:
+                return cache
+
+    return {"version": BUILD_CACHE_VERSION, "thumbnails": {}, "outputs": {}}
+
+
+def save_build_cache(cache):
+    """Write the build cache back to disk"""
+    BUILD_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    write_output(BUILD_CACHE_FILE, json.dumps(cache, indent=1, sort_keys=True))
+
+
+def file_digest(path):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    build_report.count_read(size)
+    return digest.hexdigest()
+
+
+def thumbnail_settings_key():
+    """Fingerprint of the settings that affect thumbnail output"""
+    formats = supported_thumbnail_formats()
+    settings = {
+        "size": list(THUMBNAIL_SIZE),
+        "quality": THUMBNAIL_QUALITY,
+        "widths": list(THUMBNAIL_WIDTHS),
+        "formats": {fmt: FORMAT_ENCODERS[fmt]['options'] for fmt in formats},
+        "draft": [JPEG_DRAFT_DECODE, JPEG_DRAFT_SNAP],
+        "reducing_gap": RESIZE_REDUCING_GAP,
+        "srgb": CONVERT_TO_SRGB and ImageCms is not None,
+        "placeholder": [PLACEHOLDER_SIZE, PLACEHOLDER_QUALITY],
+        "animated": sorted(ANIMATED_FORMATS)
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def inputs_fingerprint(*inputs):
+    """Fingerprint of everything a generated output is built from"""
+    payload = json.dumps([TEMPLATE_VERSION, *inputs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def output_is_current(build_cache, output_file, fingerprint):
+    """
+    True if output_file was last built from the same inputs and is still the
+    file written then; a checked out or hand edited copy differs in size or mtime
+    """
+    if build_cache is None:
+        return False
+    try:
+        stat = output_file.stat()
+    except FileNotFoundError:
+        return False
+    key = output_file.relative_to(BASE_DIR).as_posix()
+    return build_cache.get('outputs', {}).get(key) == [fingerprint, stat.st_size, stat.st_mtime_ns]
+
+
+def record_output(build_cache, output_file, fingerprint):
+    """Remember which inputs output_file was built from, and the file that came out"""
+    if build_cache is not None:
+        key = output_file.relative_to(BASE_DIR).as_posix()
+        stat = output_file.stat()
+        build_cache.setdefault('outputs', {})[key] = [fingerprint, stat.st_size, stat.st_mtime_ns]
+
+
+# ============================================================================
+# BUILD REPORT
+# ============================================================================
+
+def peak_rss_bytes(who=None):
+    """High-water mark of resident memory for this process (or its reaped children)"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who)
+    # Linux reports KB, macOS bytes
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+
+def cpu_seconds():
+    """CPU time used by this process plus any children it has reaped"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class BuildReport:
+    """
+    Collects per-stage wall/CPU time, file I/O counters, peak memory and the
+    slowest images of a build, for gen/build-report.json
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, slowest=10):
+        # Page writing runs in threads, so counters are updated under a lock
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.slowest = slowest
+        self.stages = []
+        self.breakdown = {}
+        self.images = []
+        self.critical_css = {}
+        self.grid_requests = {}
+        self.warnings = []
+        self.io = {"files_read": 0, "files_written": 0, "bytes_read": 0, "bytes_written": 0}
+
+    def count_read(self, num_bytes, files=1):
+        with self.lock:
+            self.io['files_read'] += files
+            self.io['bytes_read'] += num_bytes
+
+    def count_write(self, num_bytes, files=1):
+        with self.lock:
+            self.io['files_written'] += files
+            self.io['bytes_written'] += num_bytes
+
+    @contextmanager
+    def stage(self, name):
+        """Time a build stage and the I/O it does"""
+        wall, cpu, io = time.perf_counter(), cpu_seconds(), dict(self.io)
+        try:
+            yield
+        finally:
+            entry = {"stage": name,
+                     "wall_seconds": round(time.perf_counter() - wall, 4),
+                     "cpu_seconds": round(cpu_seconds() - cpu, 4)}
+            entry.update({key: self.io[key] - io[key] for key in self.io})
+            entry["peak_rss_bytes"] = peak_rss_bytes()
+            self.stages.append(entry)
+
+    @contextmanager
+    def timer(self, name):
+        """Accumulate time spent in one part of a streamed stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.breakdown[name] = self.breakdown.get(name, 0) + time.perf_counter() - start
+
+    def add_image(self, key, stats):
+        """Record a thumbnail worker's stats for one image"""
+        self.count_read(stats['bytes_read'])
+        self.count_write(stats['bytes_written'], files=stats['files_written'])
+        self.breakdown['thumbnail workers (summed)'] = self.breakdown.get('thumbnail workers (summed)', 0) + stats['seconds']
+        self.images.append(dict(stats, image=key))
+
+    def add_critical_css(self, page, num_bytes):
+        """Record how much critical CSS was inlined into a page"""
+        with self.lock:
+            self.critical_css[page] = num_bytes
+
+    def add_grid_requests(self, slug, before, after):
+        """Record a gallery grid's image requests without and with contact sheets"""
+        with self.lock:
+            self.grid_requests[slug] = {"thumbnails": before, "with_sheets": after}
+
+    def add_warning(self, key, message):
+        """Record something the build skipped or worked around for one input"""
+        with self.lock:
+            self.warnings.append({"image": key, "warning": message})
+
+    def as_dict(self):
+        slowest = sorted(self.images, key=lambda image: image['seconds'], reverse=True)[:self.slowest]
+        return {
+            "generated": datetime.now().isoformat(),
+            "wall_seconds": round(time.perf_counter() - self.started, 4),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "children_peak_rss_bytes": peak_rss_bytes(resource.RUSAGE_CHILDREN) if resource else None,
+            "stages": self.stages,
+            "breakdown_seconds": {name: round(seconds, 4) for name, seconds in self.breakdown.items()},
+            "images_processed": len(self.images),
+            "slowest_images": slowest,
+            "critical_css_bytes": self.critical_css,
+            "grid_requests": self.grid_requests,
+            "warnings": self.warnings
+        }
+
+    def summary(self):
+        """Human readable table of the report"""
+        report = self.as_dict()
+        mb = lambda num_bytes: f"{num_bytes / 2**20:.1f} MB" if num_bytes is not None else "-"
+        lines = [f"  {'Stage':<24} {'wall s':>8} {'cpu s':>8} {'files':>7} {'read':>10} {'written':>10} {'peak RSS':>10}"]
+        for entry in report['stages']:
+            lines.append(f"  {entry['stage']:<24} {entry['wall_seconds']:>8.3f} {entry['cpu_seconds']:>8.3f} "
+                         f"{entry['files_read'] + entry['files_written']:>7} {mb(entry['bytes_read']):>10} "
+                         f"{mb(entry['bytes_written']):>10} {mb(entry['peak_rss_bytes']):>10}")
+        for name, seconds in report['breakdown_seconds'].items():
+            lines.append(f"    {name:<34} {seconds:>8.3f}")
+        if report['slowest_images']:
+            lines.append(f"\n  Slowest {len(report['slowest_images'])} of {report['images_processed']} images:")
+            for image in report['slowest_images']:
+                lines.append(f"    {image['seconds']:>7.3f}s  cpu {image['cpu_seconds']:>6.3f}s  "
+                             f"read {mb(image['bytes_read'])}  wrote {mb(image['bytes_written'])}  "
+                             f"peak RSS {mb(image['peak_rss_bytes'])}  {image['image']}")
+        if report['critical_css_bytes']:
+            sizes = report['critical_css_bytes'].values()
+            lines.append(f"\n  Critical CSS inlined into {len(sizes)} pages: "
+                         f"{format_bytes(min(sizes))} - {format_bytes(max(sizes))} per page")
+        if report['grid_requests']:
+            before = sum(entry['thumbnails'] for entry in report['grid_requests'].values())
+            after = sum(entry['with_sheets'] for entry in report['grid_requests'].values())
+            lines.append(f"\n  Gallery grid image requests: {before} thumbnails -> {after} with contact sheets "
+                         f"({len(report['grid_requests'])} galleries)")
+        if report['warnings']:
+            lines.append(f"\n  Warnings ({len(report['warnings'])}):")
+            for entry in report['warnings']:
+                lines.append(f"    {entry['image']}: {entry['warning']}")
+        lines.append(f"\n  Total: {report['wall_seconds']:.3f}s wall")
+        return '\n'.join(lines)
+
+    def write(self, path=None):
+        path = path or BUILD_REPORT_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2)
+        return path
+
+
+# Report for the build in progress (reset by main)
+build_report = BuildReport()
+
+
+def write_output(path, content):
+    """
+    Write a generated text (or bytes) file, counting it in the build report
+    The file is replaced atomically, so a server never sees it half written,
+    and left untouched (mtime included) when the content is identical; a
+    replaced file's stale .gz/.br siblings are removed
+    Returns True if the file was written
+    """
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+
+    tmp_file = path.with_name(f".{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, path)
+    finally:
+        tmp_file.unlink(missing_ok=True)
+    # Precompressed copies of the old content must not be served until
+    # precompress_outputs() next runs (at the end of a build, or of --watch)
+    if path.suffix not in ('.gz', '.br'):
+        for ext in ('gz', 'br'):
+            path.with_name(f"{path.name}.{ext}").unlink(missing_ok=True)
+    build_report.count_write(len(data))
+    return True
+
+
+# ============================================================================
+# ASSET FINGERPRINTING
+# ============================================================================
+
+# Source path (relative to BASE_DIR) -> content-hashed copy, filled in by fingerprint_assets()
+asset_map = {}
+
+
+# quote() is slow next to the rest of a page, and every page asks for the same few assets
+quote_path = lru_cache(maxsize=1024)(quote)
+
+
+def asset_url(name, prefix=''):
+    """URL of a CSS/JS asset from a page whose path back to the root is prefix"""
+    return prefix + quote_path(asset_map.get(name, name))
+
+
+def fingerprint_assets():
+    """
+    Copy each CSS/JS asset to gen/assets/ under a content-hashed name, remove
+    copies from earlier builds and write gen/asset-map.json
+    Returns the asset map (also kept in the module-level asset_map)
+    """
+    print("Fingerprinting CSS/JS assets in /gen/assets/...\n")
+
+    assets = {}
+    copied = 0
+    sources = sorted({path for pattern in ASSET_PATTERNS for path in BASE_DIR.glob(pattern) if path.is_file()})
+    for source in sources:
+        key = source.relative_to(BASE_DIR).as_posix()
+        digest = file_digest(source)[:ASSET_HASH_LENGTH]
+        target = ASSETS_BASE / Path(key).parent / f"{source.stem}.{digest}{source.suffix}"
+        # Hashed names are cached for good, so the copy goes through write_output()
+        # (atomic, and rewritten if an earlier copy was cut short or edited)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if write_output(target, source.read_bytes()):
+            copied += 1
+            print(f"  + {key} -> {target.relative_to(BASE_DIR).as_posix()}")
+        assets[key] = target.relative_to(BASE_DIR).as_posix()
+
+    # Old copies (precompressed siblings are cleaned up by precompress_outputs)
+    current = set(assets.values())
+    if ASSETS_BASE.exists():
+        for path in ASSETS_BASE.rglob('*'):
+            if path.is_file() and path.suffix not in ('.gz', '.br') \
+                    and path.relative_to(BASE_DIR).as_posix() not in current:
+                path.unlink()
+                print(f"  - {path.relative_to(BASE_DIR).as_posix()}")
+
+    content = json.dumps(assets, indent=2, sort_keys=True)
+    if not ASSET_MAP_FILE.exists() or ASSET_MAP_FILE.read_text(encoding='utf-8') != content:
+        ASSET_MAP_FILE.parent.mkdir(parents=True, exist_ok=True)
+        write_output(ASSET_MAP_FILE, content)
+
+    asset_map.clear()
+    asset_map.update(assets)
+    print(f"\n  Assets: {len(assets)} ({copied} new)\n")
+    return assets
+
+
+# ============================================================================
+# CRITICAL CSS
+# ============================================================================
+
+# Pseudo-classes that only apply after user interaction; never needed for first paint
+INTERACTIVE_PSEUDO = re.compile(r':(?:hover|focus|focus-within|focus-visible|active|visited)\b')
+
+
+def parse_css(text):
+    """
+    Split a stylesheet into (prelude, body) rules
+    Grouping at-rules such as @media have a list of nested rules as their body
+    """
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+
+    def parse_block(pos):
+        rules = []
+        while pos < len(text):
+            brace = text.find('{', pos)
+            close = text.find('}', pos)
+            semicolon = text.find(';', pos)
+            if close != -1 and (brace == -1 or close < brace):
+                return rules, close + 1
+            if brace == -1:
+                break
+            # Statement at-rules (@import, @charset) end at ';' before any block
+            if text[pos:brace].lstrip().startswith('@') and semicolon != -1 and semicolon < brace:
+                rules.append((text[pos:semicolon].strip(), None))
+                pos = semicolon + 1
+                continue
+
+            prelude = text[pos:brace].strip()
+            if prelude.startswith(('@media', '@supports', '@layer', '@container')):
+                body, pos = parse_block(brace + 1)
+            else:
+                # Declarations (or @keyframes / @font-face contents) kept verbatim
+                depth, end = 1, brace + 1
+                while end < len(text) and depth:
+                    depth += {'{': 1, '}': -1}.get(text[end], 0)
+                    end += 1
+                body, pos = text[brace + 1:end - 1].strip(), end
+            rules.append((prelude, body))
+        return rules, len(text)
+
+    return parse_block(0)[0]
+
+
+def selector_matches(selector, tokens):
+    """True if every tag, class and id in selector appears in tokens"""
+    if INTERACTIVE_PSEUDO.search(selector):
+        return False
+    # Drop pseudo-elements/classes (and their arguments) and attribute selectors
+    selector = re.sub(r'::?[\w-]+(?:\([^)]*\))?|\[[^\]]*\]', '', selector)
+    for compound in re.split(r'[\s>+~]+', selector.strip()):
+        tag = re.match(r'[a-zA-Z][\w-]*', compound)
+        needed = ({tag.group(0).lower()} if tag else set()) \
+            | {f'.{name}' for name in re.findall(r'\.([\w-]+)', compound)} \
+            | {f'#{name}' for name in re.findall(r'#([\w-]+)', compound)}
+        if not needed <= tokens:
+            return False
+    return True
+
+
+def critical_rules(rules, tokens):
+    """CSS text for the rules (and selectors) that apply to tokens"""
+    out = []
+    for prelude, body in rules:
+        if body is None:
+            continue  # @import etc. stay with the full stylesheet
+        if isinstance(body, list):
+            inner = critical_rules(body, tokens)
+            if inner:
+                out.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith('@'):
+            out.append((prelude, body))  # @keyframes / @font-face, filtered below
+        else:
+            selectors = [sel.strip() for sel in prelude.split(',') if selector_matches(sel, tokens)]
+            if selectors:
+                out.append(f"{','.join(selectors)}{{{body}}}")
+
+    css = ''.join(rule for rule in out if isinstance(rule, str))
+    # Only keep @keyframes that a critical rule animates with, and fonts it uses
+    for prelude, body in (rule for rule in out if not isinstance(rule, str)):
+        name = prelude.split(None, 1)[1] if ' ' in prelude else ''
+        if prelude.startswith('@font-face') or (name and re.search(rf'\b{re.escape(name)}\b', css)):
+            css += f"{prelude}{{{body}}}"
+    return re.sub(r'\s+', ' ', css)
+
+
+@lru_cache(maxsize=None)
+def stylesheet_rules(path, mtime_ns):
+    """Parsed rules of a stylesheet (cached per file version)"""
+    text = path.read_text(encoding='utf-8')
+    build_report.count_read(len(text))
+    return parse_css(text)
+
+
+def page_tokens(html):
+    """Tags, .classes and #ids in the above-the-fold part of a page's <body>"""
+    body_start = html.find('<body')
+    fold = html[body_start:body_start + CRITICAL_FOLD_CHARS]
+    tokens = {'html', 'body', '*'}
+    tokens.update(tag.lower() for tag in re.findall(r'<([a-zA-Z][\w-]*)', fold))
+    for classes in re.findall(r'\bclass="([^"]*)"', fold):
+        tokens.update(f'.{name}' for name in classes.split())
+    tokens.update(f'#{name}' for name in re.findall(r'\bid="([^"]*)"', fold))
+    # Elements the page's own scripts create (e.g. gallery items) render immediately too
+    for script in re.findall(r'<script>(.*?)</script>', html, flags=re.S):
+        tokens.update(f'.{name}' for name in re.findall(r"className = '([\w-]+)'", script))
+        tokens.update(tag for tag in re.findall(r"createElement\('([\w-]+)'\)", script))
+    return tokens
+
+
+def inline_critical_css(html, page_name):
+    """
+    Inline the above-the-fold subset of a page's stylesheets in <head> and
+    switch the full stylesheets to non-blocking loads
+    """
+    if not INLINE_CRITICAL_CSS:
+        return html
+
+    head_end = html.find('</head>')
+    links = list(re.finditer(r'<link rel="stylesheet" href="([^"]+)"([^>]*)>', html[:head_end]))
+    rules = []
+    for link in links:
+        # ../gen/assets/styles.1234abcd.css -> the file on disk
+        path = BASE_DIR / link.group(1).split('?')[0].lstrip('./')
+        if path.is_file():
+            rules.extend(stylesheet_rules(path, path.stat().st_mtime_ns))
+    if not rules:
+        return html
+
+    css = critical_rules(rules, page_tokens(html))
+    build_report.add_critical_css(page_name, len(css.encode('utf-8')))
+
+    def non_blocking(link):
+        href, attrs = link.group(1), link.group(2)
+        return (f'<link rel="preload" href="{href}" as="style"{attrs} onload="this.onload=null;this.rel=\'stylesheet\'">'
+                f'<noscript><link rel="stylesheet" href="{href}"></noscript>')
+
+    # The critical rules go ahead of the first stylesheet (now a preload), so
+    # they are in place for the first paint; the new line keeps its indent
+    head, first = html[:head_end], links[0].start()
+    indent = head[head.rfind('\n', 0, first) + 1:first]
+    indent = indent if indent.isspace() else ''
+    rest = re.sub(r'<link rel="stylesheet" href="([^"]+)"([^>]*)>', non_blocking, head[first:])
+    return f"{head[:first]}<style>{css}</style>\n{indent}{rest}{html[head_end:]}"
+
+
+def restore_stylesheet_links(html):
+    """
+    Undo inline_critical_css(): drop the inlined rules and turn the preloads
+    back into plain stylesheet links, so a page can be edited and inlined again
+    """
+    head_end = html.find('</head>')
+    head = re.sub(r'<style>.*?</style>\n[ \t]*(?=<link rel="preload")', '', html[:head_end], count=1, flags=re.S)
+    head = re.sub(r'<link rel="preload" href="([^"]+)" as="style"([^>]*?) '
+                  r'onload="this\.onload=null;this\.rel=\'stylesheet\'">'
+                  r'<noscript><link rel="stylesheet" href="[^"]+"></noscript>',
+                  r'<link rel="stylesheet" href="\1"\2>', head)
+    return head + html[head_end:]
+
+
+# ============================================================================
+# TEMPLATES
+# ============================================================================
+
+class Markup(str):
+    """Text that is already HTML and must not be escaped again"""
+
+
+# Characters html.escape() would change; most values have none, so skip the five replaces
+HTML_SPECIAL = re.compile(r'[&<>"\']')
+
+
+def escape(value):
+    """HTML-escape a value for template output (the only place this happens)"""
+    if value.__class__ is not str:
+        if isinstance(value, Markup):
+            return value
+        value = str(value)
+    return html_escape(value, quote=True) if HTML_SPECIAL.search(value) else value
+
+
+# One compact encoder for every inlined value; json.dumps() would build a new one per call.
+# Pages are UTF-8, so non-ASCII text goes in as it is, and the data is built here so it
+# never needs the circular reference check
+INLINE_JSON_ENCODER = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, check_circular=False)
+
+
+def inline_json(data):
+    """JSON safe to place inside a <script> element"""
+    text = INLINE_JSON_ENCODER.encode(data)
+    if '<' not in text:
+        return text
+    # "</" could close the element early and "<!--" changes how it is parsed
+    return text.replace('</', '<\\/').replace('<!--', '<\\u0021--')
+
+
+# {{ value | filter }} filters; each returns text that is safe as it is, so a
+# filtered value skips escape()
+TEMPLATE_FILTERS = {
+    'raw': Markup,                                   # trusted HTML, e.g. rendered Editor.js blocks
+    'json': inline_json,                             # inside <script>
+    'url': lambda value: quote(str(value)),
+}
+
+# Tags and comments alone on their line take the whole line with them, so block structure
+# does not leave blank lines behind
+TEMPLATE_TOKEN = re.compile(r'^[ \t]*(\{%(?:(?!%\}).)*%\}|\{#.*?#\})[ \t]*(?:\n|\Z)|(\{\{.*?\}\}|\{%.*?%\}|\{#.*?#\})', re.M)
+
+# A trailing "| name" on an expression, applied only if name is a known filter
+TEMPLATE_FILTER = re.compile(r'\s*\|\s*(\w+)\s*$')
+
+
+class Template:
+    """
+    A template compiled once into a Python function
+    Syntax: {{ expr }} (escaped), {{ expr | raw/json/url }}, {% if/elif/else/endif %},
+    {% for x in expr %}...{% endfor %}, {% set x = expr %}, {% include "partial.html" %}
+    and {# comments #}. Expressions are plain Python over the render context.
+    """
+
+    def __init__(self, source, name):
+        self.name = name
+        self.names = set()      # context names the template reads (a sorted tuple once compiled)
+        self.cache = {}         # rendered output by context values, when used as a partial
+        namespace = {}
+        exec(compile(self.compile(source), f"<template {name}>", 'exec'), {}, namespace)
+        self.function = namespace['render']
+        self.names = tuple(sorted(self.names))
+
+    def compile(self, source):
+        """Python source of a render(__ctx, __lookup, __escape, __filters, __include) function"""
+        lines, depth, stack, bound = [], 1, [], set()
+        # Output up to the next tag is gathered into one append of adjacent literals, which
+        # Python joins like an f-string. Values (their index in parts) go through __v0, __v1...,
+        # once per distinct expression
+        parts, values = [], []
+
+        def flush():
+            if parts:
+                for number, code in enumerate(values):
+                    lines.append('    ' * depth + f"__v{number} = {code}")
+                text = ' '.join(repr(part) if isinstance(part, str) else f"f'{{__v{part}}}'" for part in parts)
+                lines.append('    ' * depth + f"__append({text})")
+            parts.clear()
+            values.clear()
+
+        def emit(line):
+            flush()
+            lines.append('    ' * depth + line)
+
+        def output(text=None, code=None):
+            if code is None:
+                parts.append(text)
+                return
+            if code not in values:
+                values.append(code)
+            parts.append(values.index(code))
+
+        def expression(expr):
+            tree = ast.parse(expr, mode='eval')
+            # Names bound inside the expression (comprehensions, lambdas) are not context
+            local = {node.id for comp in ast.walk(tree) if isinstance(comp, ast.comprehension)
+                     for node in ast.walk(comp.target) if isinstance(node, ast.Name)}
+            local |= {arg.arg for node in ast.walk(tree) if isinstance(node, ast.Lambda) for arg in node.args.args}
+            self.names.update(node.id for node in ast.walk(tree)
+                              if isinstance(node, ast.Name) and node.id not in bound | local)
+            return f"({expr})"
+
+        pos = 0
+        for match in TEMPLATE_TOKEN.finditer(source):
+            if match.start() > pos:
+                output(source[pos:match.start()])
+            pos = match.end()
+            token = match.group(1) or match.group(2)
+
+            if token.startswith('{#'):
+                continue
+            if token.startswith('{{'):
+                expr, filters = token[2:-2].strip(), []
+                while (trailing := TEMPLATE_FILTER.search(expr)) and trailing.group(1) in TEMPLATE_FILTERS:
+                    filters.insert(0, trailing.group(1))
+                    expr = expr[:trailing.start()]
+                code = expression(expr)
+                for name in filters:
+                    code = f"__filters[{name!r}]({code})"
+                output(code=code if filters else f"__escape({code})")
+                continue
+
+            words = token[2:-2].strip()
+            keyword, _, rest = words.partition(' ')
+            if keyword in ('if', 'for'):
+                if keyword == 'for':
+                    target, _, iterable = rest.partition(' in ')
+                    iterable = expression(iterable)
+                    bound.update(name.strip() for name in target.split(','))
+                    emit(f"for {target} in {iterable}:")
+                else:
+                    emit(f"if {expression(rest)}:")
+                stack.append(keyword)
+                depth += 1
+            elif keyword in ('elif', 'else'):
+                emit("pass")
+                depth -= 1
+                emit(f"elif {expression(rest)}:" if keyword == 'elif' else "else:")
+                depth += 1
+            elif keyword in ('endif', 'endfor'):
+                if not stack or stack.pop() != keyword[3:]:
+                    raise SyntaxError(f"{self.name}: unexpected {{% {keyword} %}}")
+                emit("pass")
+                depth -= 1
+            elif keyword == 'set':
+                target, _, expr = rest.partition('=')
+                code = expression(expr.strip())
+                bound.add(target.strip())
+                emit(f"{target.strip()} = {code}")
+            elif keyword == 'include':
+                output(code=f"__include({ast.literal_eval(rest)!r}, {{**__ctx, **locals()}})")
+            else:
+                raise SyntaxError(f"{self.name}: unknown tag {token}")
+        if pos < len(source):
+            output(source[pos:])
+        flush()
+        if stack:
+            raise SyntaxError(f"{self.name}: unclosed {{% {stack[-1]} %}}")
+
+        # Most names are in the context, so only fall back to __lookup() for the rest
+        prologue = [f"    {name} = __ctx[{name!r}] if {name!r} in __ctx else __lookup(__ctx, {name!r})"
+                    for name in sorted(self.names)]
+        return '\n'.join(["def render(__ctx, __lookup, __escape, __filters, __include):",
+                          "    __out = []",
+                          "    __append = __out.append",
+                          *prologue, *lines,
+                          "    return ''.join(__out)"])
+
+    def render(self, context=None, **values):
+        """Render with a context dict (and/or keyword values)"""
+        context = dict(context or {}, **values)
+        return Markup(self.function(context, template_lookup, escape, TEMPLATE_FILTERS, render_partial))
+
+    def render_cached(self, context):
+        """
+        Render as a partial, reusing the output for the same values of the names it reads
+        Page writer threads share the cache, so it is only read with get(); another
+        thread clearing it in between just means a fresh render
+        """
+        key = tuple(context.get(name) for name in self.names)
+        try:
+            hash(key)
+        except TypeError:
+            key = json.dumps(key, sort_keys=True, default=str)
+        output = self.cache.get(key)
+        if output is None:
+            if len(self.cache) > 1024:
+                self.cache.clear()
+            output = self.cache[key] = self.render({name: context[name] for name in self.names if name in context})
+        return output
+
+
+# Helpers every template can call without them being passed in
+TEMPLATE_GLOBALS = {
+    'asset_url': asset_url,
+}
+
+
+def template_lookup(context, name):
+    """Resolve a name used in a template: context, then template globals, then builtins"""
+    if name in context:
+        return context[name]
+    if name in TEMPLATE_GLOBALS:
+        return TEMPLATE_GLOBALS[name]
+    if hasattr(builtins, name):
+        return getattr(builtins, name)
+    raise NameError(f"template variable '{name}' is not defined")
+
+
+# Compiled templates by name, kept for the rest of the build
+_templates = {}
+
+
+def reset_templates():
+    """Forget compiled templates so a new build picks up edited files"""
+    _templates.clear()
+    templates_fingerprint.cache_clear()
+
+
+def get_template(name):
+    """Load and compile templates/{name} once per build"""
+    template = _templates.get(name)
+    if template is None:
+        source = (TEMPLATES_BASE / name).read_text(encoding='utf-8')
+        build_report.count_read(len(source))
+        template = _templates[name] = Template(source, name)
+    return template
+
+
+def render_partial(name, context):
+    """{% include %}: render a partial with the including template's variables"""
+    return get_template(name).render_cached(context)
+
+
+def render_template(name, **context):
+    """Render templates/{name} with the given variables"""
+    return get_template(name).render(context)
+
+
+@lru_cache(maxsize=None)
+def templates_fingerprint():
+    """Fingerprint of the template files, so editing one rebuilds the pages"""
+    return inputs_fingerprint(sorted([path.relative_to(TEMPLATES_BASE).as_posix(), file_digest(path)]
+                                     for path in TEMPLATES_BASE.rglob('*.html')))
+
+
 # ============================================================================
 # EDITOR.JS BLOCK RENDERER
 # ============================================================================
@@ -130,177 +1039,738 @@ def render_editorjs_block(block):
 # STEP 1: DISCOVER IMAGE FOLDERS
 # ============================================================================
 
-def discover_image_folders(base_path):
+def iter_image_folders(base_path, start=None):
     """
-    Discover top-level project folders containing images
+    Yield (project_slug, folder info) for each folder containing images, as it is found
     Skips nested subfolders to avoid duplicate galleries
-    Returns dict mapping project_slug -> folder_path
+    Folder info includes the size/mtime/inode of every image so later
+    steps never stat them again
+    With start (a folder under base_path) only that folder and its subfolders
+    are scanned, with the same exclusions and slugs as a full scan
     """
-    print("Discovering image folders...")
-
-    discovered = {}
+    def excluded(path):
+        """Excluded folders and special subfolders"""
+        return path.name in EXCLUDE_FOLDERS or path.name.lower() in ['final', 'page1', 'page2', 'section1-process', 'section2-team', 'shelf_final', 'temple final']
 
     def scan_directory(path, depth=0, max_depth=3):
         """Scan directories for images, limited depth to avoid nested duplicates"""
-        if not path.is_dir():
-            return
-
-        # Skip excluded folders and special subfolders
-        if path.name in EXCLUDE_FOLDERS or path.name.lower() in ['final', 'page1', 'page2', 'section1-process', 'section2-team', 'shelf_final', 'temple final']:
+        if excluded(path):
             return
 
         # Skip if too deep (prevents nested galleries)
         if depth > max_depth:
             return
 
-        # Check if this folder contains images
-        images = [f for f in path.iterdir()
-                 if f.is_file() and f.suffix in IMAGE_EXTENSIONS]
+        # One directory read per folder; DirEntry caches its stat result
+        files = {}
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if entry.name not in EXCLUDE_FOLDERS:
+                            subdirs.append(entry.name)
+                    elif entry.is_file() and os.path.splitext(entry.name)[1] in IMAGE_EXTENSIONS:
+                        stat = entry.stat()
+                        files[entry.name] = {
+                            "size": stat.st_size,
+                            "mtime_ns": stat.st_mtime_ns,
+                            "inode": entry.inode()
+                        }
+        except OSError:
+            return
 
-        if images:
+        if files:
             # Create slug from relative path
             rel_path = path.relative_to(base_path)
             # Platform-agnostic: use Path.parts to avoid OS-specific separators
             slug = '-'.join(rel_path.parts).lower().replace(' ', '-')
+            images = sorted(files)
 
-            discovered[slug] = {
+            print(f"  + Found: {rel_path} ({len(images)} images) -> {slug}")
+
+            yield slug, {
                 'path': path,
                 'rel_path': rel_path,
                 'image_count': len(images),
-                'images': sorted([img.name for img in images])
+                'images': images,
+                'files': {name: files[name] for name in images}
             }
 
-            print(f"  + Found: {rel_path} ({len(images)} images) -> {slug}")
-
         # Always recurse into subdirectories unless too deep
-        for subdir in sorted(path.iterdir()):
-            if subdir.is_dir() and subdir.name not in EXCLUDE_FOLDERS:
-                scan_directory(subdir, depth + 1, max_depth)
+        for name in sorted(subdirs):
+            yield from scan_directory(path / name, depth + 1, max_depth)
 
-    scan_directory(base_path)
+    if start is None:
+        yield from scan_directory(base_path)
+        return
 
-    print(f"\nDiscovered {len(discovered)} image folders\n")
-    return discovered
+    # A full scan would never have reached start below an excluded folder
+    parts = start.relative_to(base_path).parts
+    if any(excluded(base_path.joinpath(*parts[:depth])) for depth in range(1, len(parts))):
+        return
+    yield from scan_directory(start, len(parts))
+
+
+def image_stat(info, img_name):
+    """Size/mtime of an image, from discovery when available"""
+    cached = info.get('files', {}).get(img_name)
+    if cached:
+        return cached
+    stat = (info['path'] / img_name).stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "inode": stat.st_ino}
 
 # ============================================================================
 # STEP 2: GENERATE THUMBNAILS
 # ============================================================================
 
-def generate_thumbnail(image_path, thumb_path, size=THUMBNAIL_SIZE):
-    """Generate a thumbnail for an image"""
+def supported_thumbnail_formats():
+    """THUMBNAIL_FORMATS the installed Pillow can encode (JPEG always included)"""
+    formats = []
+    for fmt in THUMBNAIL_FORMATS:
+        with warnings.catch_warnings():
+            # Older Pillow releases warn about features they have never heard of
+            warnings.simplefilter('ignore')
+            if fmt == 'jpeg' or features.check(fmt):
+                formats.append(fmt)
+    if 'jpeg' not in formats:
+        formats.append('jpeg')
+    return formats
+
+
+def variant_name(stem, width, fmt='jpeg'):
+    """Filename of a responsive thumbnail variant"""
+    return f"{stem}-{width}w.{FORMAT_ENCODERS[fmt]['ext']}"
+
+
+def build_srcset(url_prefix, stem, widths, fmt='jpeg', version=None):
+    """srcset attribute value for the responsive variants of an image"""
+    query = f"?v={version}" if version else ""
+    return ', '.join(f"{quote(url_prefix + variant_name(stem, width, fmt))}{query} {width}w" for width in widths)
+
+
+def format_bytes(num_bytes):
+    """Human readable byte count"""
+    if abs(num_bytes) < 1024:
+        return f"{num_bytes} B"
+    for unit in ('KB', 'MB', 'GB'):
+        num_bytes /= 1024
+        if abs(num_bytes) < 1024 or unit == 'GB':
+            return f"{num_bytes:.1f} {unit}"
+
+
+def to_srgb(img):
+    """
+    Convert an image with an embedded ICC profile to sRGB (see CONVERT_TO_SRGB)
+    Returns (image, ICC profile the outputs still need to embed, or None)
+    """
+    icc_profile = img.info.get('icc_profile')
+    if not icc_profile:
+        return img, None
+    if CONVERT_TO_SRGB and ImageCms is not None and img.mode in ('RGB', 'CMYK'):
+        try:
+            source = ImageCms.ImageCmsProfile(io.BytesIO(icc_profile))
+            return ImageCms.profileToProfile(img, source, ImageCms.createProfile('sRGB'), outputMode='RGB'), None
+        except ImageCms.PyCMSError:
+            pass  # Unreadable profile; keep it and let the browser try
+    return img, icc_profile
+
+
+def image_placeholder(img, formats):
+    """
+    Average colour and a tiny base64 preview of an (already downscaled) image
+    The preview is WebP when that is being generated anyway, JPEG otherwise
+    """
+    img = img.convert('RGB')
+    color = '#%02x%02x%02x' % img.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+
+    preview = img.copy()
+    preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.Resampling.BOX)
+    fmt = 'webp' if 'webp' in formats else 'jpeg'
+    buffer = io.BytesIO()
+    preview.save(buffer, FORMAT_ENCODERS[fmt]['format'], quality=PLACEHOLDER_QUALITY)
+    data = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return {"color": color, "placeholder": f"data:{FORMAT_ENCODERS[fmt]['mime']};base64,{data}"}
+
+
+def thumbnail_geometry(img, size=THUMBNAIL_SIZE, widths=THUMBNAIL_WIDTHS):
+    """
+    Plan an opened image's outputs from its header alone
+    Returns (EXIF orientation, displayed (width, height), widths of the
+    responsive variants, fixed-box thumbnail size)
+    """
+    orientation = img.getexif().get(ExifTags.Base.Orientation, 1)
+    width, height = img.size
+    # Orientations 5-8 are stored turned by 90 degrees
+    if orientation in (5, 6, 7, 8):
+        width, height = height, width
+    ladder = sorted({w for w in widths if w < width})
+    if width <= max(widths):
+        ladder.append(width)
+
+    # Let the largest output fit a 1/2, 1/4 or 1/8 scale JPEG decode when it
+    # only just misses one (the draft is sized from it, see JPEG_DRAFT_SNAP)
+    if JPEG_DRAFT_DECODE and img.format in DRAFT_FORMATS:
+        for scale in (8, 4, 2):
+            reduced = width // scale
+            if reduced < ladder[-1] <= reduced * (1 + JPEG_DRAFT_SNAP) and (len(ladder) < 2 or reduced > ladder[-2]):
+                ladder[-1] = reduced
+                break
+
+    # Fixed-box thumbnail size, as Image.thumbnail() would produce
+    scale = min(size[0] / width, size[1] / height, 1)
+    thumb_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return orientation, (width, height), ladder, thumb_size
+
+
+def decode_cost(img, size=THUMBNAIL_SIZE, widths=THUMBNAIL_WIDTHS):
+    """
+    Estimate the memory generate_thumbnail() needs for an opened image, from
+    its header alone: the decoded frame (JPEGs at the draft scale they will
+    get) plus one RGB working copy for rotation or colour conversion
+    Returns (decoded pixels, bytes)
+    """
+    stored_width, stored_height = img.size
+    scale = 1
+    # Only JPEG needs the planned outputs (and so EXIF, which PNG can only
+    # produce by decoding the whole image)
+    if JPEG_DRAFT_DECODE and img.format in DRAFT_FORMATS:
+        orientation, (width, height), ladder, thumb_size = thumbnail_geometry(img, size, widths)
+        largest = max(ladder + [thumb_size[0]])
+        needed = (largest, max(1, round(height * largest / width)))
+        if orientation in (5, 6, 7, 8):
+            needed = needed[::-1]
+        # Same choice Image.draft() makes: the biggest of 1/8, 1/4, 1/2 still covering the output
+        fits = min(stored_width // needed[0], stored_height // needed[1])
+        scale = next((s for s in (8, 4, 2) if fits >= s), 1)
+    pixels = -(-stored_width // scale) * -(-stored_height // scale)
+
+    # Pillow keeps RGB(A), CMYK, 32-bit etc. at 4 bytes a pixel
+    pixel_bytes = 1 if img.mode in ('1', 'L', 'P') else 2 if img.mode.startswith('I;16') else 4
+    return pixels, pixels * (pixel_bytes + 4)
+
+
+def thumbnail_cost(image_path, size=THUMBNAIL_SIZE, widths=THUMBNAIL_WIDTHS):
+    """
+    decode_cost() bytes for an image file, for scheduling workers
+    Capped at THUMBNAIL_MAX_IMAGE_BYTES, since bigger images are turned away
+    by the worker once it has read the header; 0 if the header is unreadable
+    """
     try:
-        with Image.open(image_path) as img:
-            # Convert RGBA to RGB if needed
-            if img.mode == 'RGBA':
-                img = img.convert('RGB')
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            with Image.open(image_path) as img:
+                cost = decode_cost(img, size, widths)[1]
+    except Exception:
+        return 0
+    return min(cost, THUMBNAIL_MAX_IMAGE_BYTES) if THUMBNAIL_MAX_IMAGE_BYTES else cost
 
-            # Create thumbnail (maintains aspect ratio)
-            img.thumbnail(size, Image.Resampling.LANCZOS)
+
+class ThumbnailBudget:
+    """
+    Tracks the estimated decode memory of thumbnail tasks handed to the pool
+    A task fits while everything in flight stays within THUMBNAIL_MEMORY_BUDGET;
+    with nothing in flight any task fits, so the build always moves on
+    """
+
+    def __init__(self, limit=None):
+        self.limit = THUMBNAIL_MEMORY_BUDGET if limit is None else limit
+        self.costs = {}
+        self.used = 0
+
+    def fits(self, cost):
+        return not self.limit or not self.costs or self.used + cost <= self.limit
+
+    def add(self, future, cost):
+        self.costs[future] = cost
+        self.used += cost
+
+    def release(self, future):
+        self.used -= self.costs.pop(future, 0)
+
+
+def generate_thumbnail(image_path, thumb_path, size=THUMBNAIL_SIZE, widths=THUMBNAIL_WIDTHS, formats=None):
+    """
+    Generate a thumbnail for an image, plus its responsive width variants
+    in every supported format, all from a single decode
+    Media info also records the image's size, average colour and placeholder
+    EXIF orientation is applied to the pixels and metadata is not copied over
+    Animated sources (GIF, WebP, APNG) are thumbnailed from their first frame
+    Returns {"media": manifest info, "bytes": bytes written per format,
+    "stats": timing/I/O for the build report, "warning": optional note},
+    {"skipped": reason} for an image over THUMBNAIL_MAX_IMAGE_BYTES,
+    or None on failure
+    """
+    if formats is None:
+        formats = supported_thumbnail_formats()
+    started, cpu_started = time.perf_counter(), time.process_time()
+
+    try:
+        # decode_cost() below stands in for Pillow's pixel-count warning
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            img = Image.open(image_path)
+        with img:
+            # Only the header has been read so far; turn away anything that
+            # would not fit in memory before a single pixel is decoded
+            pixels, cost = decode_cost(img, size, widths)
+            if THUMBNAIL_MAX_IMAGE_BYTES and cost > THUMBNAIL_MAX_IMAGE_BYTES:
+                return {"skipped": f"{img.size[0]}x{img.size[1]} {img.format} needs ~{format_bytes(cost)} "
+                                   f"to decode ({pixels / 1e6:.0f} MP), over the "
+                                   f"{format_bytes(THUMBNAIL_MAX_IMAGE_BYTES)} per-image limit"}
+
+            # Plan outputs from the full size
+            orientation, (width, height), ladder, thumb_size = thumbnail_geometry(img, size, widths)
+            turned = orientation in (5, 6, 7, 8)
+
+            # Only the first frame of an animation is ever decoded (MPO camera
+            # JPEGs also report several frames, but they are not animations)
+            animated = img.format in ANIMATED_FORMATS and getattr(img, 'is_animated', False)
+            if animated:
+                img.seek(0)
+
+            # Resize largest to smallest, each step starting from the previous
+            # output so the full-size image is only resampled once
+            targets = [((w, max(1, round(height * w / width))),
+                        thumb_path.with_name(variant_name(thumb_path.stem, w)))
+                       for w in ladder]
+            targets.append((thumb_size, thumb_path))
+            targets.sort(key=lambda target: target[0][0], reverse=True)
+
+            # Decode JPEGs at the smallest DCT scale still covering the largest
+            # output (no-op for other formats); must happen before any load()
+            if JPEG_DRAFT_DECODE:
+                img.draft('RGB', targets[0][0][::-1] if turned else targets[0][0])
+
+            # Rotate once here so browsers never have to, then drop EXIF, XMP
+            # and the like; only a colour profile that wasn't converted is kept
+            if orientation != 1:
+                img = ImageOps.exif_transpose(img)
+            img, icc_profile = to_srgb(img)
+            img.info = {}
+            keep_profile = {'icc_profile': icc_profile} if icc_profile else {}
+
+            # JPEG can only hold RGB/greyscale (RGBA, palette PNG/GIF etc. need converting)
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
 
             # Ensure parent directory exists
             thumb_path.parent.mkdir(parents=True, exist_ok=True)
 
-            # Save as JPEG with reduced quality
-            img.save(thumb_path, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
-            return True
+            current = img
+            written = dict.fromkeys(formats, 0)
+            files_written = 0
+            for target_size, target_path in targets:
+                if current.size != target_size:
+                    current = current.resize(target_size, Image.Resampling.LANCZOS,
+                                             reducing_gap=RESIZE_REDUCING_GAP)
+
+                if target_path == thumb_path:
+                    # Save as JPEG with reduced quality
+                    current.save(target_path, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True, **keep_profile)
+                    thumb_bytes = target_path.stat().st_size
+                    files_written += 1
+                    continue
+
+                # Encode the same resized pixels once per output format
+                for fmt in formats:
+                    encoder = FORMAT_ENCODERS[fmt]
+                    format_path = target_path.with_name(variant_name(thumb_path.stem, target_size[0], fmt))
+                    current.save(format_path, encoder['format'], **encoder['options'], **keep_profile)
+                    written[fmt] += format_path.stat().st_size
+                    files_written += 1
+
+            # The last (smallest) output is plenty for a 16px preview
+            media = {"widths": ladder, "formats": formats, "width": width, "height": height,
+                     "needs_rotation": orientation != 1}
+            if animated:
+                media['animated'] = True
+            media.update(image_placeholder(current, formats))
+
+            stats = {
+                "seconds": round(time.perf_counter() - started, 4),
+                "cpu_seconds": round(time.process_time() - cpu_started, 4),
+                "megapixels": round(width * height / 1e6, 1),
+                "bytes_read": image_path.stat().st_size,
+                "bytes_written": thumb_bytes + sum(written.values()),
+                "files_written": files_written,
+                # High-water mark of the worker process as of this image
+                "peak_rss_bytes": peak_rss_bytes()
+            }
+            result = {"media": media, "bytes": written, "stats": stats}
+            if animated:
+                result['warning'] = "animated; thumbnails show the first frame only"
+            return result
+    except Image.DecompressionBombError as e:
+        return {"skipped": str(e)}
     except Exception as e:
         print(f"    Error processing {image_path.name}: {e}")
-        return False
+        return None
 
-def generate_all_thumbnails(discovered_folders):
-    """Generate thumbnails for all images"""
-    print("Generating thumbnails in /gen/thumbnails/...\n")
+def plan_thumbnails(info, cached_thumbs, seen_thumbs, settings_key):
+    """
+    Work out which of a folder's images need (re)generating
+    Unchanged images (by content hash and thumbnail settings) are marked as
+    seen and their cached media copied into info['media']
+    Returns a list of (img_name, img_file, thumb_file, cache_key, entry) tasks
+    """
+    folder_path = info['path']
+    rel_path = info['rel_path']
 
-    total_images = 0
-    total_thumbnails = 0
-    total_new = 0
+    # Create thumbnail directory mirroring source structure
+    thumb_dir = THUMBNAILS_BASE / rel_path
+    thumb_dir.mkdir(parents=True, exist_ok=True)
+    with os.scandir(thumb_dir) as entries:
+        existing_thumbs = {entry.name for entry in entries}
+
+    media = info['media'] = {}
+    tasks = []
+    for img_name in info['images']:
+        img_file = folder_path / img_name
+        thumb_file = thumb_dir / f"{img_file.stem}.jpg"
+        cache_key = (rel_path / img_name).as_posix()
+        stat = image_stat(info, img_name)
+
+        entry = cached_thumbs.get(cache_key)
+        if entry and entry['settings'] == settings_key and thumb_file.name in existing_thumbs:
+            # Same size and mtime: trust the entry without reading the file
+            if entry['size'] == stat['size'] and entry['mtime_ns'] == stat['mtime_ns']:
+                seen_thumbs[cache_key] = entry
+                media[img_name] = entry['media']
+                continue
 
-    for slug, info in discovered_folders.items():
-        folder_path = info['path']
-        rel_path = info['rel_path']
+            # Timestamps moved (checkout, copy, restore) - compare content
+            digest = file_digest(img_file)
+            if digest == entry['sha256']:
+                entry.update(size=stat['size'], mtime_ns=stat['mtime_ns'])
+                seen_thumbs[cache_key] = entry
+                media[img_name] = entry['media']
+                continue
+        else:
+            digest = file_digest(img_file)
+
+        entry = {
+            "sha256": digest,
+            "size": stat['size'],
+            "mtime_ns": stat['mtime_ns'],
+            "settings": settings_key,
+            "thumbnail": thumb_file.relative_to(THUMBNAILS_BASE).as_posix()
+        }
+        tasks.append((img_name, img_file, thumb_file, cache_key, entry))
 
-        # Create thumbnail directory mirroring source structure
-        thumb_dir = THUMBNAILS_BASE / rel_path
-        thumb_dir.mkdir(parents=True, exist_ok=True)
+    return tasks
 
-        new_thumbs = 0
-        for img_name in info['images']:
-            img_file = folder_path / img_name
-            thumb_file = thumb_dir / f"{img_file.stem}.jpg"
 
-            total_images += 1
+def apply_thumbnail_result(info, task, result, seen_thumbs):
+    """Record a finished thumbnail task; returns True if it succeeded"""
+    img_name, _, _, cache_key, entry = task
+    if not result:
+        return False
+    if 'skipped' in result:
+        print(f"    Skipped {img_name}: {result['skipped']}")
+        build_report.add_warning(cache_key, f"skipped: {result['skipped']}")
+        return False
+    result = dict(result)
+    build_report.add_image(cache_key, result.pop('stats'))
+    if 'warning' in result:
+        build_report.add_warning(cache_key, result.pop('warning'))
+    # Cache-busting token for the thumbnail URLs: changes only with the source or settings
+    result['media']['version'] = hashlib.sha256(
+        f"{entry['sha256']}:{entry['settings']}".encode()).hexdigest()[:ASSET_HASH_LENGTH]
+    entry.update(result)
+    seen_thumbs[cache_key] = entry
+    info['media'][img_name] = result['media']
+    return True
+
+
+def print_format_summary(seen_thumbs, formats):
+    """Compare what each format costs for the whole tree against plain JPEG"""
+    format_totals = dict.fromkeys(formats, 0)
+    for entry in seen_thumbs.values():
+        for fmt, size in entry.get('bytes', {}).items():
+            if fmt in format_totals:
+                format_totals[fmt] += size
+    jpeg_bytes = format_totals.get('jpeg', 0)
+    for fmt in formats:
+        line = f"  {fmt}: {format_bytes(format_totals[fmt])}"
+        if fmt != 'jpeg' and jpeg_bytes:
+            saved = jpeg_bytes - format_totals[fmt]
+            line += f" (saves {format_bytes(saved)}, {saved / jpeg_bytes:.0%} vs JPEG)"
+        print(line)
 
-            # Skip if thumbnail exists and is newer
-            if thumb_file.exists() and thumb_file.stat().st_mtime > img_file.stat().st_mtime:
-                total_thumbnails += 1
-                continue
+# ============================================================================
+# STEP 2B: CONTACT SHEETS
+# ============================================================================
+
+def contact_sheet_settings():
+    """The settings that affect contact sheet output"""
+    return [CONTACT_SHEET_TILE, CONTACT_SHEET_COLUMNS, CONTACT_SHEET_TILES, CONTACT_SHEET_QUALITY]
+
+
+def plan_contact_sheets(images, media):
+    """
+    Lay out a gallery's tiles, in display order, on contact sheets
+    Returns (sheets, tiles): the sheet entries for the manifest and each
+    image's [sheet, column, row]. Images without a thumbnail get no tile.
+    """
+    tiled = [img for img in images if img in media]
+    if not CONTACT_SHEETS or len(tiled) < CONTACT_SHEET_MIN_IMAGES:
+        return [], {}
+
+    sheets, tiles = [], {}
+    for number, start in enumerate(range(0, len(tiled), CONTACT_SHEET_TILES)):
+        group = tiled[start:start + CONTACT_SHEET_TILES]
+        for position, img in enumerate(group):
+            tiles[img] = [number, position % CONTACT_SHEET_COLUMNS, position // CONTACT_SHEET_COLUMNS]
+        sheets.append({
+            "file": f"{number}.jpg",
+            # Changes whenever a tile's thumbnail does, so it doubles as the ?v= cache buster
+            "version": inputs_fingerprint(contact_sheet_settings(),
+                                          [[img, media[img].get('version')] for img in group])[:8],
+            "columns": min(len(group), CONTACT_SHEET_COLUMNS),
+            "rows": -(-len(group) // CONTACT_SHEET_COLUMNS)
+        })
+    return sheets, tiles
+
+
+# Fitted tiles by thumbnail path -> (thumbnail mtime, tile), kept while --watch
+# runs so re-rendering a gallery's sheets only decodes the tiles that changed
+# (None: not kept, since a full build renders each sheet once)
+sheet_tile_cache = None
+
+
+def render_contact_sheet(tiles, columns, rows):
+    """JPEG bytes of one sheet from (thumbnail path, column, row) tiles"""
+    size = CONTACT_SHEET_TILE
+    cache = sheet_tile_cache
+    sheet = Image.new('RGB', (columns * size, rows * size), (128, 128, 128))
+    for thumb_file, column, row in tiles:
+        stat = thumb_file.stat()
+        cached = cache.get(thumb_file) if cache is not None else None
+        if cached and cached[0] == stat.st_mtime_ns:
+            tile = cached[1]
+        else:
+            with Image.open(thumb_file) as img:
+                build_report.count_read(stat.st_size)
+                # The thumbnails are JPEGs, so this decodes at a reduced scale
+                img.draft('RGB', (size, size))
+                tile = ImageOps.fit(img.convert('RGB'), (size, size), Image.Resampling.LANCZOS)
+            if cache is not None:
+                cache[thumb_file] = (stat.st_mtime_ns, tile)
+        sheet.paste(tile, (column * size, row * size))
 
-            if generate_thumbnail(img_file, thumb_file):
-                total_thumbnails += 1
-                new_thumbs += 1
-                total_new += 1
+    buffer = io.BytesIO()
+    sheet.save(buffer, 'JPEG', quality=CONTACT_SHEET_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
 
-        if new_thumbs > 0:
-            print(f"  + {rel_path}: {new_thumbs} new thumbnails")
 
-    print(f"\n  Thumbnails: {total_thumbnails}/{total_images} ({total_new} new)\n")
-    return total_thumbnails
+def write_contact_sheets(slug, info, build_cache=None):
+    """
+    Render the contact sheets a project's manifest lays out, from its thumbnails
+    Sheets whose tiles have not changed are left alone and sheets the gallery no
+    longer needs are deleted. Returns how many sheets were written.
+    """
+    manifest = project_manifest(slug) or {}
+    sheets = manifest.get('sheets', [])
+    groups = [[] for _ in sheets]
+    for img in manifest.get('images', []):
+        tile = manifest['media'].get(img, {}).get('tile')
+        if tile:
+            thumb_file = THUMBNAILS_BASE / info['rel_path'] / f"{Path(img).stem}.jpg"
+            groups[tile[0]].append((thumb_file, tile[1], tile[2]))
+
+    sheet_dir = SHEETS_BASE / slug
+    written = 0
+    for sheet, tiles in zip(sheets, groups):
+        sheet_file = sheet_dir / sheet['file']
+        if output_is_current(build_cache, sheet_file, sheet['version']):
+            continue
+        sheet_dir.mkdir(parents=True, exist_ok=True)
+        write_output(sheet_file, render_contact_sheet(tiles, sheet['columns'], sheet['rows']))
+        record_output(build_cache, sheet_file, sheet['version'])
+        written += 1
+
+    if sheet_dir.is_dir():
+        wanted = {sheet['file'] for sheet in sheets}
+        for path in sheet_dir.iterdir():
+            if path.name not in wanted:
+                path.unlink()
+        if not wanted:
+            sheet_dir.rmdir()
+    return written
 
 # ============================================================================
 # STEP 3: GENERATE MANIFESTS
 # ============================================================================
 
-def generate_manifest(slug, info, image_orders=None, hidden_images=None):
-    """Generate JSON manifest for a project"""
-    images = info['images'].copy()
-
-    # Filter out hidden images
-    if hidden_images and slug in hidden_images:
-        hidden_list = hidden_images[slug]
-        images = [img for img in images if img not in hidden_list]
-
-    # Apply custom order if exists
-    if image_orders and slug in image_orders:
-        custom_order = image_orders[slug]
-        # Sort images based on custom order, keeping new images at the end
-        def sort_key(img):
-            if img in custom_order:
-                return custom_order.index(img)
-            return len(custom_order) + info['images'].index(img)
-        images = sorted(images, key=sort_key)
-
-    manifest = {
+# Manifest contents by slug for the current build, filled by generate_manifest()
+# so later stages (pages, site index, index.html cards) never re-read them from disk
+manifest_registry = {}
+
+
+def project_manifest(slug):
+    """
+    A project's manifest from the build's registry
+    Falls back to gen/manifests/{slug}.json (and registers it) when the
+    manifest was not generated in this process; None if there is none
+    """
+    manifest = manifest_registry.get(slug)
+    if manifest is None:
+        manifest_file = MANIFESTS_BASE / f"{slug}.json"
+        if not manifest_file.exists():
+            return None
+        text = manifest_file.read_text(encoding='utf-8')
+        build_report.count_read(len(text))
+        manifest = manifest_registry[slug] = json.loads(text)
+    return manifest
+
+
+def manifest_fingerprint(slug, info, image_orders=None, hidden_images=None):
+    """Fingerprint of the inputs a project's manifest is built from"""
+    return inputs_fingerprint(
+        slug,
+        str(info['rel_path']),
+        info['images'],
+        (image_orders or {}).get(slug),
+        (hidden_images or {}).get(slug),
+        info.get('media'),
+        MANIFEST_CHUNK_SIZE,
+        CONTACT_SHEETS and [CONTACT_SHEET_MIN_IMAGES, *contact_sheet_settings()]
+    )
+
+def order_images(images, custom_order=None, hidden=None):
+    """
+    Visible images in display order, in linear time
+    Images listed in custom_order come first in that order; any others
+    (e.g. newly added) follow in their original order
+    """
+    hidden = set(hidden or ())
+    visible = [img for img in images if img not in hidden]
+    if not custom_order:
+        return visible
+
+    visible_set = set(visible)
+    # dict.fromkeys keeps the first position of anything listed twice
+    ordered = [img for img in dict.fromkeys(custom_order) if img in visible_set]
+    ranked = set(custom_order)
+    return ordered + [img for img in visible if img not in ranked]
+
+def build_manifest(slug, info, image_orders=None, hidden_images=None):
+    """Manifest contents for a project, as written to gen/manifests/{slug}.json"""
+    # Filter out hidden images and apply any custom order, keeping new images at the end
+    images = order_images(info['images'], (image_orders or {}).get(slug), (hidden_images or {}).get(slug))
+    media = info.get('media', {})
+    sheets, tiles = plan_contact_sheets(images, media)
+
+    return {
         "project": str(info['rel_path']),
         "slug": slug,
         "count": len(images),  # Count visible images only
         "total_count": info['image_count'],  # Total including hidden
         "images": images,
+        "media": {img: dict(media[img], tile=tiles[img]) if img in tiles else media[img]
+                  for img in images if img in media},
+        "sheets": sheets,
         "generated": datetime.now().isoformat()
     }
 
-    # Determine manifest path
+def manifest_chunks(manifest, chunk_size=None):
+    """
+    A manifest's images split into chunks of chunk_size (default MANIFEST_CHUNK_SIZE),
+    each with the media entries and contact sheets for its images; [] if the
+    gallery is small enough to stay in one piece
+    """
+    chunk_size = chunk_size or MANIFEST_CHUNK_SIZE
+    images = manifest['images']
+    if not chunk_size or len(images) <= chunk_size:
+        return []
+    media = manifest.get('media', {})
+    sheets = manifest.get('sheets', [])
+    chunks = []
+    for start in range(0, len(images), chunk_size):
+        part = images[start:start + chunk_size]
+        chunk_media = {img: media[img] for img in part if img in media}
+        # Only the sheets this chunk's tiles are on, keyed by sheet number
+        used = sorted({entry['tile'][0] for entry in chunk_media.values() if 'tile' in entry})
+        chunks.append({"images": part, "media": chunk_media, "sheets": {str(number): sheets[number] for number in used}})
+    return chunks
+
+
+def chunk_index(manifest, chunks):
+    """Contents of gen/manifests/{slug}/index.json for a chunked manifest"""
+    return {
+        "slug": manifest['slug'],
+        "count": manifest['count'],
+        "chunk_size": len(chunks[0]['images']),
+        "chunks": [f"{number}.json" for number in range(len(chunks))]
+    }
+
+
+def write_manifest_chunks(slug, manifest):
+    """
+    Write (or remove) gen/manifests/{slug}/ for a manifest
+    Chunk files left over from a bigger gallery are deleted
+    """
+    chunk_dir = MANIFESTS_BASE / slug
+    chunks = manifest_chunks(manifest)
+    wanted = set()
+    if chunks:
+        chunk_dir.mkdir(parents=True, exist_ok=True)
+        for number, chunk in enumerate(chunks):
+            wanted.add(f"{number}.json")
+            write_output(chunk_dir / f"{number}.json", json.dumps(chunk, separators=(',', ':')))
+        wanted.add('index.json')
+        write_output(chunk_dir / 'index.json', json.dumps(chunk_index(manifest, chunks), indent=2))
+    if chunk_dir.is_dir():
+        for path in chunk_dir.iterdir():
+            if path.name.removesuffix('.gz').removesuffix('.br') not in wanted:
+                path.unlink()  # stale chunk (or its .gz/.br sibling)
+        if not wanted:
+            chunk_dir.rmdir()
+    return len(chunks)
+
+
+def generate_manifest(slug, info, image_orders=None, hidden_images=None, build_cache=None):
+    """
+    Generate JSON manifest for a project
+    The contents are kept in manifest_registry even when the file itself
+    was already current
+    Returns (manifest_file, written) - written is False when it was already current
+    """
     manifest_file = MANIFESTS_BASE / f"{slug}.json"
-    manifest_file.parent.mkdir(parents=True, exist_ok=True)
+    fingerprint = manifest_fingerprint(slug, info, image_orders, hidden_images)
+    info['manifest_fingerprint'] = fingerprint
+    manifest = manifest_registry[slug] = build_manifest(slug, info, image_orders, hidden_images)
+
+    if output_is_current(build_cache, manifest_file, fingerprint):
+        return manifest_file, False
 
-    with open(manifest_file, 'w', encoding='utf-8') as f:
-        json.dump(manifest, f, indent=2)
+    manifest_file.parent.mkdir(parents=True, exist_ok=True)
 
-    return manifest_file
+    write_output(manifest_file, json.dumps(manifest, indent=2))
+    write_manifest_chunks(slug, manifest)
 
-def generate_all_manifests(discovered_folders, image_orders=None, hidden_images=None):
-    """Generate manifest files for all projects"""
-    print("Generating manifests in /gen/manifests/...\n")
+    record_output(build_cache, manifest_file, fingerprint)
+    return manifest_file, True
 
-    for slug, info in discovered_folders.items():
-        manifest_file = generate_manifest(slug, info, image_orders, hidden_images)
+def write_project_manifest(slug, info, image_orders=None, hidden_images=None, build_cache=None):
+    """Generate one project's manifest and report it; returns False if it was already current"""
+    manifest_file, written = generate_manifest(slug, info, image_orders, hidden_images, build_cache)
+    if written:
         rel_manifest = manifest_file.relative_to(BASE_DIR)
         has_custom_order = image_orders and slug in image_orders
         has_hidden = hidden_images and slug in hidden_images
         order_indicator = " (custom order)" if has_custom_order else ""
         hidden_indicator = f" ({len(hidden_images[slug])} hidden)" if has_hidden else ""
-        print(f"  + {slug} ->{rel_manifest}{order_indicator}{hidden_indicator}")
+        chunks = len(manifest_chunks(manifest_registry[slug]))
+        chunk_indicator = f" ({chunks} chunks)" if chunks else ""
+        print(f"  + {slug} ->{rel_manifest}{order_indicator}{hidden_indicator}{chunk_indicator}")
 
-    print(f"\n  Generated {len(discovered_folders)} manifests\n")
+    # Grid requests: one per thumbnail, or one per sheet plus any untiled thumbnails
+    media = manifest_registry[slug]['media']
+    untiled = sum(1 for entry in media.values() if 'tile' not in entry)
+    build_report.add_grid_requests(slug, len(media), len(manifest_registry[slug]['sheets']) + untiled)
+    return written
 
 # ============================================================================
 # STEP 4: GENERATE PROJECT PAGES
@@ -322,163 +1792,265 @@ def get_project_metadata(slug, metadata_db, defaults):
         "category": "makers"
     }
 
-def generate_project_page(slug, info, metadata, template='default', layout='default'):
+def generate_project_page(slug, info, metadata, template='default', layout='default', live_switch=False):
     """Generate HTML page for a project"""
 
     rel_path = info['rel_path']
-    image_count = info['image_count']
 
     # Relative paths for assets
     asset_prefix = '../'
-    version_suffix = f'?v={ASSET_VERSION}'
-
-    html = f'''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{metadata['title']} | Reyan Makes</title>
-    <meta name="description" content="{metadata['description']}">
-    <link rel="stylesheet" href="{asset_prefix}styles.css{version_suffix}">
-    <script src="{asset_prefix}config-loader.js"></script>
-</head>
-<body>
-    <nav class="navbar">
-        <div class="nav-container">
-            <a href="{asset_prefix}index.html" class="logo">Reyan Makes</a>
-            <ul class="nav-menu">
-                <li><a href="{asset_prefix}index.html#featured" class="nav-link">Featured</a></li>
-                <li><a href="{asset_prefix}index.html#timeline" class="nav-link">Journey</a></li>
-                <li><a href="{asset_prefix}index.html#contact" class="nav-link">Contact</a></li>
-            </ul>
-        </div>
-    </nav>
-
-    <div class="breadcrumb">
-        <div class="container">
-            <ul class="breadcrumb-list">
-                <li><a href="{asset_prefix}index.html" class="breadcrumb-link">Home</a></li>
-                <li><span class="breadcrumb-current">{metadata['title']}</span></li>
-            </ul>
-        </div>
-    </div>
-
-    <section class="project-hero">
-        <div class="project-hero-content">
-            <h1>{metadata['title']}</h1>
-            <div class="project-hero-meta">
-                <span class="year-badge">{metadata['year']}</span>
-                <span>•</span>
-                <span>{metadata['tags']}</span>
-            </div>
-            <p class="project-hero-description">
-                {metadata['description']}
-            </p>
-        </div>
-    </section>
 
-    <section style="padding: 4rem 0; background: var(--bg-secondary);">
-        <div class="container">
-            <h2 class="section-title">Gallery</h2>
-            <p class="section-subtitle">Documenting the entire process - {image_count} images</p>
-
-            <div class="gallery-grid" id="gallery">
-                <!-- Images will be loaded dynamically from the manifest -->
-            </div>
-        </div>
-    </section>
-
-    <section style="padding: 3rem 0; text-align: center;">
-        <div class="container">
-            <a href="{asset_prefix}index.html" class="contact-button">← Back to Home</a>
-        </div>
-    </section>
-
-    <footer class="footer">
-        <div class="container">
-            <p>&copy; 2025 Reyan Bhattacharjee | Built with passion</p>
-        </div>
-    </footer>
-
-    <script src="{asset_prefix}lightbox.js{version_suffix}"></script>
-    <script>
-        // Load gallery images dynamically from manifest
-        const gallery = document.getElementById('gallery');
-        const basePath = '{asset_prefix}images/{rel_path}/';
-        const thumbPath = '{asset_prefix}gen/thumbnails/{rel_path}/';
-        const manifestPath = '{asset_prefix}gen/manifests/{slug}.json';
-        const isMobile = window.innerWidth <= 768;
-
-        fetch(manifestPath)
-            .then(response => {{
-                if (!response.ok) {{
-                    throw new Error(`HTTP error! status: ${{response.status}}`);
-                }}
-                return response.json();
-            }})
-            .then(manifest => {{
-                manifest.images.forEach(filename => {{
-                    const item = document.createElement('div');
-                    item.className = 'gallery-item';
-
-                    const img = document.createElement('img');
-                    const thumbFilename = filename.replace(/\\.(jpg|jpeg|png|JPG|JPEG|PNG)$/i, '.jpg');
-                    img.src = isMobile ? thumbPath + thumbFilename : basePath + filename;
-                    img.dataset.fullImage = basePath + filename;
-                    img.alt = '{metadata['title']}';
-                    img.className = 'gallery-image';
-                    img.loading = 'lazy';
-
-                    item.appendChild(img);
-                    gallery.appendChild(item);
-                }});
-
-                if (typeof initializeGallery === 'function') {{
-                    initializeGallery();
-                }}
-            }})
-            .catch(error => {{
-                console.error('Error loading gallery:', error);
-                gallery.innerHTML = `<p style="text-align:center; color: var(--text-light);">Error loading images: ${{error.message}}. Please try refreshing the page.</p>`;
-            }});
-    </script>
-</body>
-</html>
-'''
-
-    return html
-
-def generate_all_project_pages(discovered_folders, metadata_config):
-    """Generate HTML pages for all projects"""
-    print("Generating project pages in /projects/...\n")
-
-    # Ensure projects directory exists
-    PROJECTS_BASE.mkdir(parents=True, exist_ok=True)
+    manifest_path = f"{asset_prefix}gen/manifests/{slug}.json"
+    chunk_base = f"{asset_prefix}gen/manifests/{slug}/"
+    manifest = project_manifest(slug)
+    chunks = manifest_chunks(manifest) if manifest else []
+    if chunks:
+        # The script starts from the chunk index when nothing is inlined
+        manifest_path = chunk_base + 'index.json'
+
+    # Only what the gallery script reads from the manifest; for a chunked
+    # gallery that is the first chunk and the names of the rest
+    inline_manifest = None
+    if INLINE_MANIFESTS and manifest:
+        if chunks:
+            inline_manifest = dict(chunks[0], chunks=chunk_index(manifest, chunks)['chunks'][1:])
+        else:
+            inline_manifest = {key: manifest[key] for key in ('images', 'media', 'sheets')}
+
+    return render_template(
+        'project.html',
+        metadata=metadata,
+        image_count=info['image_count'],
+        prefix=asset_prefix,
+        layout=layout,
+        theme=template,
+        style_head=site_style_head(layout, template, live_switch, asset_prefix),
+        manifest=inline_manifest,
+        base_path=f"{asset_prefix}images/{rel_path}/",
+        thumb_path=f"{asset_prefix}gen/thumbnails/{rel_path}/",
+        manifest_path=manifest_path,
+        chunk_base=chunk_base,
+        sheet_path=f"{asset_prefix}gen/sheets/{slug}/",
+        gallery_sizes=GALLERY_IMAGE_SIZES,
+        format_types={fmt: [enc['ext'], enc['mime']] for fmt, enc in FORMAT_ENCODERS.items()}
+    )
 
+def write_project_page(slug, info, metadata_config, build_cache=None):
+    """Render and write one project's page; returns False if it was already current"""
     projects_meta = metadata_config.get("projects", {})
     defaults = metadata_config.get("defaults", {})
     template = metadata_config.get("siteSettings", {}).get("template", "default")
     layout = metadata_config.get("siteSettings", {}).get("layout", "default")
+    live_switch = bool(metadata_config.get("siteSettings", {}).get("liveSwitch"))
+    metadata = get_project_metadata(slug, projects_meta, defaults)
+
+    output_file = PROJECTS_BASE / f"{slug}.html"
+    manifest = project_manifest(slug)
+    # An inlined manifest makes the page depend on everything the manifest does;
+    # otherwise only on whether it is chunked (which changes the URL fetched)
+    fingerprint = inputs_fingerprint(
+        slug, str(info['rel_path']), info['image_count'], metadata, template, layout, live_switch, asset_map,
+        templates_fingerprint(), INLINE_CRITICAL_CSS and CRITICAL_FOLD_CHARS,
+        INLINE_MANIFESTS and info.get('manifest_fingerprint'),
+        bool(manifest and manifest_chunks(manifest))
+    )
+    if output_is_current(build_cache, output_file, fingerprint):
+        return False
 
-    for slug, info in discovered_folders.items():
-        metadata = get_project_metadata(slug, projects_meta, defaults)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    html = inline_critical_css(generate_project_page(slug, info, metadata, template, layout, live_switch),
+                               output_file.relative_to(BASE_DIR).as_posix())
 
-        output_file = PROJECTS_BASE / f"{slug}.html"
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        html = generate_project_page(slug, info, metadata, template, layout)
+    write_output(output_file, html)
+    record_output(build_cache, output_file, fingerprint)
 
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html)
+    print(f"  + {slug}.html ({info['image_count']} images)")
+    return True
 
-        print(f"  + {slug}.html ({info['image_count']} images)")
+# ============================================================================
+# STEPS 1-4 STREAMED: DISCOVER -> THUMBNAILS -> MANIFEST -> PAGE PER FOLDER
+# ============================================================================
+
+def build_galleries(base_path, metadata_config, image_orders=None, hidden_images=None,
+                    build_cache=None, jobs=1, folders=None):
+    """
+    Discover folders and build each one's thumbnails, manifest and page as a stream
+    A folder's manifest and page are written as soon as its last thumbnail
+    finishes, while discovery and other folders' thumbnails carry on.
+    With folders ((slug, info) pairs, e.g. from --watch) only those are built
+    instead of discovering base_path, and other folders' cache entries are kept.
+    Returns the discovered folders dict once everything is done.
+    """
+    print("Building galleries (discover -> thumbnails -> manifest -> page)...\n")
+
+    if build_cache is None:
+        build_cache = load_build_cache()
+    formats = supported_thumbnail_formats()
+    print(f"  Thumbnail formats: {', '.join(formats)}\n")
+
+    cached_thumbs = build_cache.setdefault('thumbnails', {})
+    seen_thumbs = {}
+    settings_key = thumbnail_settings_key()
+    PROJECTS_BASE.mkdir(parents=True, exist_ok=True)
+
+    # Two folders can map to the same slug (last one wins); if the previous
+    # build saw that happen, hold the loser back so its outputs are not written
+    # and then immediately overwritten
+    previous_owners = build_cache.get('slugs', {})
+
+    discovered = {}
+    remaining = {}      # id(info) -> [thumbnails in flight, thumbnails generated]
+    new_counts = {}     # slug -> thumbnails generated this build
+    finished = {}       # slug -> rel_path whose outputs were written
+    deferred = set()
+    in_flight = {}      # future -> (slug, info, task)
+    max_in_flight = jobs * 4
+    budget = ThumbnailBudget()
+    page_writes = {}    # slug -> latest page and contact sheet write futures
+    page_pool = ThreadPoolExecutor(max_workers=PAGE_WRITE_THREADS)
+
+    def write_page(slug, info):
+        with build_report.timer('project pages'):
+            write_project_page(slug, info, metadata_config, build_cache)
+
+    def write_sheets(slug, info):
+        with build_report.timer('contact sheets'):
+            write_contact_sheets(slug, info, build_cache)
+
+    def finish_folder(slug, info):
+        """Write a folder's manifest and page once all its thumbnails exist"""
+        # Folders finish in whatever order their thumbnails do, but the one
+        # discovered last keeps a shared slug; it is finished on its own
+        if discovered.get(slug) is not info:
+            print(f"  Warning: {discovered[slug]['rel_path']} replaces {info['rel_path']} as '{slug}'")
+            return
+        owner = previous_owners.get(slug)
+        if owner and owner != info['rel_path'].as_posix() and (base_path / owner).is_dir():
+            deferred.add(slug)
+            return
+        if slug in finished:
+            print(f"  Warning: {info['rel_path']} replaces {finished[slug]} as '{slug}'")
+        with build_report.timer('manifests'):
+            write_project_manifest(slug, info, image_orders, hidden_images, build_cache)
+        # A replaced slug's earlier page and sheets must land first, so the last folder wins
+        if slug in page_writes:
+            for future in page_writes[slug]:
+                future.result()
+        page_writes[slug] = [page_pool.submit(write_page, slug, info), page_pool.submit(write_sheets, slug, info)]
+        finished[slug] = info['rel_path'].as_posix()
+
+    def folder_done(slug, info, new_thumbs):
+        """Report a folder's thumbnails and move it on to manifest/page writing"""
+        new_counts[slug] = new_thumbs
+        if new_thumbs:
+            print(f"  + {info['rel_path']}: {new_thumbs} new thumbnails")
+        finish_folder(slug, info)
+
+    def collect(done):
+        """Apply finished thumbnail futures and finish folders that are complete"""
+        for future in done:
+            slug, info, task = in_flight.pop(future)
+            budget.release(future)
+            progress = remaining[id(info)]
+            progress[1] += apply_thumbnail_result(info, task, future.result(), seen_thumbs)
+            progress[0] -= 1
+            if progress[0] == 0:
+                folder_done(slug, info, progress[1])
+
+    def timed_discovery():
+        """iter_image_folders, with the time spent scanning counted separately"""
+        folders = iter_image_folders(base_path)
+        while True:
+            with build_report.timer('discovery'):
+                folder = next(folders, None)
+            if folder is None:
+                return
+            yield folder
+
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        for slug, info in timed_discovery() if folders is None else folders:
+            discovered[slug] = info
+            with build_report.timer('thumbnail planning'):
+                tasks = plan_thumbnails(info, cached_thumbs, seen_thumbs, settings_key)
+
+            if pool is None or not tasks:
+                new_thumbs = sum(apply_thumbnail_result(info, task, generate_thumbnail(task[1], task[2], formats=formats),
+                                                        seen_thumbs)
+                                 for task in tasks)
+                folder_done(slug, info, new_thumbs)
+                continue
+
+            # Keyed by record, not slug, so a colliding folder cannot mix counts
+            remaining[id(info)] = [len(tasks), 0]
+            for task in tasks:
+                # Wait for memory to free up rather than overcommit the workers
+                cost = thumbnail_cost(task[1])
+                while not budget.fits(cost):
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                future = pool.submit(generate_thumbnail, task[1], task[2], THUMBNAIL_SIZE, THUMBNAIL_WIDTHS, formats)
+                budget.add(future, cost)
+                in_flight[future] = (slug, info, task)
+
+            # Pick up whatever has finished; block only if too much is queued
+            collect([future for future in in_flight if future.done()])
+            while len(in_flight) > max_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+
+        # Folders held back for a slug collision that no longer exists; when
+        # only some folders are rebuilt the owner is never reached, so there
+        # only its folder being gone frees the slug
+        for slug in sorted(deferred):
+            info = discovered[slug]
+            owner = previous_owners.get(slug)
+            if slug in finished or (folders is not None and owner and (base_path / owner).is_dir()):
+                continue
+            previous_owners.pop(slug, None)
+            finish_folder(slug, info)
+
+        # Surface any page or sheet write errors
+        for futures in page_writes.values():
+            for future in futures:
+                future.result()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        page_pool.shutdown()
+
+    total_images = sum(info['image_count'] for info in discovered.values())
+    if folders is not None:
+        # Entries of the rebuilt folders are replaced, everyone else's kept
+        rebuilt = {info['rel_path'].as_posix() for info in discovered.values()}
+        build_cache['thumbnails'] = {key: entry for key, entry in cached_thumbs.items()
+                                     if (os.path.dirname(key) or '.') not in rebuilt}
+        build_cache['thumbnails'].update(seen_thumbs)
+        build_cache.setdefault('slugs', {}).update(
+            {slug: info['rel_path'].as_posix() for slug, info in discovered.items()})
+        print(f"\n  Rebuilt {len(discovered)} image folders, {total_images} images "
+              f"({sum(new_counts.values())} new thumbnails)\n")
+        return discovered
+
+    build_cache['thumbnails'] = seen_thumbs
+    build_cache['slugs'] = {slug: info['rel_path'].as_posix() for slug, info in discovered.items()}
+
+    print()
+    print_format_summary(seen_thumbs, formats)
+    print(f"\n  Discovered {len(discovered)} image folders, {total_images} images "
+          f"({sum(new_counts.values())} new thumbnails)\n")
+    return discovered
 
-    print(f"\n  Generated {len(discovered_folders)} project pages\n")
 
 # ============================================================================
 # STEP 5: GENERATE SITE INDEX
 # ============================================================================
 
-def generate_site_index(discovered_folders, metadata_config):
+def generate_site_index(discovered_folders, metadata_config, build_cache=None):
     """Generate a JSON index of all projects for easy reference"""
     print("Generating site index...\n")
 
@@ -494,10 +2066,12 @@ def generate_site_index(discovered_folders, metadata_config):
 
     for slug, info in discovered_folders.items():
         metadata = get_project_metadata(slug, projects_meta, defaults)
+        manifest = project_manifest(slug)
 
         index["projects"][slug] = {
             "path": str(info['rel_path']),
             "images": info['image_count'],
+            "visible_images": manifest['count'] if manifest else info['image_count'],
             "title": metadata['title'],
             "year": metadata['year'],
             "tags": metadata['tags'],
@@ -508,10 +2082,13 @@ def generate_site_index(discovered_folders, metadata_config):
         }
 
     index_file = GEN_BASE / 'site-index.json'
-    with open(index_file, 'w', encoding='utf-8') as f:
-        json.dump(index, f, indent=2)
-
-    print(f"  + Site index: {index_file.relative_to(BASE_DIR)}")
+    fingerprint = inputs_fingerprint(index['projects'])
+    if output_is_current(build_cache, index_file, fingerprint):
+        print(f"  = Site index unchanged: {index_file.relative_to(BASE_DIR)}")
+    else:
+        write_output(index_file, json.dumps(index, indent=2))
+        record_output(build_cache, index_file, fingerprint)
+        print(f"  + Site index: {index_file.relative_to(BASE_DIR)}")
     print(f"  {index['total_projects']} projects, {index['total_images']} total images\n")
 
     return index
@@ -520,149 +2097,184 @@ def generate_site_index(discovered_folders, metadata_config):
 # STEP 6: UPDATE INDEX.HTML FEATURED SECTION
 # ============================================================================
 
-def generate_featured_card(slug, project_info, metadata, is_first=False):
-    """Generate HTML for a single featured project card"""
+def featured_card_context(slug, project_info, metadata, is_first=False):
+    """Values for partials/card.html for a single featured project"""
     rel_path = str(project_info['rel_path'])  # Use rel_path, not path
-    images = project_info['image_count']
 
     # Get first image for the card
-    manifest_file = MANIFESTS_BASE / f"{slug}.json"
+    manifest = project_manifest(slug)
     first_image = ""
-    if manifest_file.exists():
-        with open(manifest_file, 'r') as f:
-            manifest = json.load(f)
-            if manifest.get('images'):
-                first_image = manifest['images'][0]
-
-    image_path = f"images/{rel_path}/{first_image}" if first_image else ""
-
-    # Parse tags into individual spans
-    tags = metadata.get('tags', '').split(' • ')
-    tags_html = '\n                            '.join(f'<span class="tag">{tag.strip()}</span>' for tag in tags if tag.strip())
-
-    featured_class = ' featured' if is_first else ''
-
-    return f'''                <div class="project-card{featured_class}">
-                    <div class="project-header">
-                        <span class="year-badge">{metadata.get('year', '2024')}</span>
-                        <h3>{metadata.get('title', slug)}</h3>
-                        <a href="projects/{slug}.html" class="view-gallery-btn">View Gallery ({images} images)</a>
-                    </div>
-                    <div class="project-image">
-                        <img src="{image_path}" alt="{metadata.get('title', slug)}" loading="lazy"
-                             onerror="this.src='data:image/svg+xml,%3Csvg xmlns=%22http://www.w3.org/2000/svg%22 width=%22400%22 height=%22300%22%3E%3Crect fill=%22%23667eea%22 width=%22400%22 height=%22300%22/%3E%3Ctext fill=%22white%22 font-size=%2236%22 x=%22100%22 y=%22160%22%3E{metadata.get('title', slug)}%3C/text%3E%3C/svg%3E'">
-                    </div>
-                    <div class="project-details">
-                        <p class="project-description">{metadata.get('description', '')}</p>
-                        <div class="project-tags">
-                            {tags_html}
-                        </div>
-                    </div>
-                </div>'''
+    first_media = None
+    if manifest and manifest.get('images'):
+        first_image = manifest['images'][0]
+        first_media = manifest.get('media', {}).get(first_image)
+    first_media = first_media or {}
 
+    card = {
+        "slug": slug,
+        "featured": is_first,
+        "year": metadata.get('year', '2024'),
+        "title": metadata.get('title', slug),
+        "description": metadata.get('description', ''),
+        # Parse tags into individual spans
+        "tags": [tag.strip() for tag in metadata.get('tags', '').split(' • ') if tag.strip()],
+        "images": project_info['image_count'],
+        "src": f"images/{rel_path}/{first_image}" if first_image else "",
+        "srcset": None,
+        "sources": [],
+        "sizes": CARD_IMAGE_SIZES,
+        "width": first_media.get('width'),
+        "height": first_media.get('height'),
+        "background": None,
+    }
+    if first_media.get('color'):
+        # Shown behind the card image until it loads
+        card['background'] = first_media['color']
+        if first_media.get('placeholder'):
+            card['background'] += f" url('{first_media['placeholder']}') center / cover"
+    if first_media.get('widths'):
+        # Thumbnail as the fallback, responsive variants via srcset
+        stem = Path(first_image).stem
+        thumb_prefix = f"gen/thumbnails/{rel_path}/"
+        widths = first_media['widths']
+        version = first_media.get('version')
+        card['src'] = quote(f"{thumb_prefix}{stem}.jpg") + (f"?v={version}" if version else "")
+        card['srcset'] = build_srcset(thumb_prefix, stem, widths, version=version)
+        card['sources'] = [
+            {"type": FORMAT_ENCODERS[fmt]["mime"], "srcset": build_srcset(thumb_prefix, stem, widths, fmt, version)}
+            for fmt in first_media.get('formats', []) if fmt != 'jpeg'
+        ]
+    return card
 
-def update_index_theme(metadata_config):
-    """Update the theme CSS link in index.html based on metadata"""
-    import re
 
+def generate_featured_card(slug, project_info, metadata, is_first=False):
+    """Generate HTML for a single featured project card"""
+    return render_partial('partials/card.html', {"card": featured_card_context(slug, project_info, metadata, is_first)})
+
+
+def site_stylesheet_link(kind, name, prefix=''):
+    """<link> for a layout or theme stylesheet, tagged so config-loader.js can swap it"""
+    folder = 'layouts' if kind == 'layout' else 'themes'
+    return f'<link rel="stylesheet" href="{asset_url(f"{folder}/{name}.css", prefix)}" data-site-{kind}="{name}">'
+
+
+def site_style_head(layout, theme, live_switch=False, prefix=''):
+    """
+    Layout and theme stylesheets for a page's <head>, resolved at build time
+    With live_switch (siteSettings.liveSwitch) config-loader.js is added too,
+    to pick up changes to site-config.json made after the build
+    """
+    tags = [site_stylesheet_link('layout', layout, prefix), site_stylesheet_link('theme', theme, prefix)]
+    if live_switch:
+        tags.append(f'<script src="{asset_url("config-loader.js", prefix)}" defer></script>')
+    return '\n    '.join(tags)
+
+
+def set_body_class(content, kind, name):
+    """Replace (or add) the layout-*/theme-* class on a page's <body>"""
+    def update(match):
+        classes = [cls for cls in match.group(1).split() if not cls.startswith(f'{kind}-')]
+        return f'<body class="{" ".join(classes + [f"{kind}-{name}"])}">'
+
+    if re.search(r'<body class="[^"]*">', content):
+        return re.sub(r'<body class="([^"]*)">', update, content, count=1)
+    return content.replace('<body>', f'<body class="{kind}-{name}">', 1)
+
+
+def update_index_theme(metadata_config):
+    """Update the theme CSS link and body class in index.html based on metadata"""
     index_file = BASE_DIR / 'index.html'
     if not index_file.exists():
         return
 
     template = metadata_config.get("siteSettings", {}).get("template", "default")
-    version_suffix = f'?v={ASSET_VERSION}'
 
     with open(index_file, 'r') as f:
-        content = f.read()
+        content = restore_stylesheet_links(f.read())
 
-    # Check if theme link already exists
-    theme_link = f'<link rel="stylesheet" href="themes/{template}.css{version_suffix}">'
+    # Check if theme link already exists (plain or fingerprinted)
+    theme_link = site_stylesheet_link('theme', template)
 
     if 'themes/' in content:
         # Update existing theme link
         content = re.sub(
-            r'<link rel="stylesheet" href="themes/[^"]+\.css[^"]*">',
-            theme_link,
+            r'<link rel="stylesheet" href="(?:gen/assets/)?themes/[^"]+\.css[^"]*"[^>]*>',
+            lambda match: theme_link,
             content
         )
     else:
         # Add theme link after styles.css
         content = re.sub(
-            r'(<link rel="stylesheet" href="styles\.css[^"]*">)',
+            r'(<link rel="stylesheet" href="(?:gen/assets/)?styles\.[^"]*css[^"]*">)',
             f'\\1\n    {theme_link}',
             content
         )
 
-    with open(index_file, 'w', encoding='utf-8') as f:
-        f.write(content)
+    content = set_body_class(content, 'theme', template)
+    # The critical rules depend on the theme, so they are worked out again
+    content = inline_critical_css(content, 'index.html')
+
+    write_output(index_file, content)
 
     print(f"  + Applied '{template}' theme to index.html\n")
 
 
 def update_index_layout(metadata_config):
     """Update the layout CSS link and body class in index.html based on metadata"""
-    import re
-
     index_file = BASE_DIR / 'index.html'
     if not index_file.exists():
         return
 
     layout = metadata_config.get("siteSettings", {}).get("layout", "default")
-    version_suffix = f'?v={ASSET_VERSION}'
 
     with open(index_file, 'r') as f:
-        content = f.read()
+        content = restore_stylesheet_links(f.read())
 
-    # Update layout CSS link
-    layout_link = f'<link rel="stylesheet" href="layouts/{layout}.css{version_suffix}">'
+    # Update layout CSS link (plain or fingerprinted)
+    layout_link = site_stylesheet_link('layout', layout)
 
     if 'layouts/' in content:
         # Update existing layout link
         content = re.sub(
-            r'<link rel="stylesheet" href="layouts/[^"]+\.css[^"]*">',
-            layout_link,
+            r'<link rel="stylesheet" href="(?:gen/assets/)?layouts/[^"]+\.css[^"]*"[^>]*>',
+            lambda match: layout_link,
             content
         )
     else:
-        # Add layout link after theme link
-        if 'themes/' in content:
-            content = re.sub(
-                r'(<link rel="stylesheet" href="themes/[^"]+\.css[^"]*">)',
-                f'\\1\n    {layout_link}',
-                content
-            )
-        else:
-            # Add after styles.css
-            content = re.sub(
-                r'(<link rel="stylesheet" href="styles\.css[^"]*">)',
-                f'\\1\n    {layout_link}',
-                content
-            )
-
-    # Update body class
-    body_class = f'class="layout-{layout}"'
-
-    if 'class="layout-' in content:
-        # Update existing layout class
+        # Add layout link after styles.css, ahead of the theme as the pages have it
         content = re.sub(
-            r'<body class="layout-[^"]*">',
-            f'<body {body_class}>',
+            r'(<link rel="stylesheet" href="(?:gen/assets/)?styles\.[^"]*css[^"]*">)',
+            f'\\1\n    {layout_link}',
             content
         )
-    elif '<body>' in content:
-        # Add class to body tag
-        content = content.replace('<body>', f'<body {body_class}>')
 
-    with open(index_file, 'w', encoding='utf-8') as f:
-        f.write(content)
+    content = set_body_class(content, 'layout', layout)
+    # The critical rules depend on the layout, so they are worked out again
+    content = inline_critical_css(content, 'index.html')
+
+    write_output(index_file, content)
 
     print(f"  + Applied '{layout}' layout to index.html\n")
 
 
-def generate_index_html(discovered_folders, metadata_config):
+def generate_index_html(discovered_folders, metadata_config, build_cache=None):
     """Generate complete index.html from siteContent configuration"""
     print("Generating index.html from configuration...\n")
 
+    # Cards depend on each project's manifest (first image), so track those too
+    index_file = BASE_DIR / 'index.html'
+    fingerprint = inputs_fingerprint(
+        metadata_config,
+        [[slug, str(info['rel_path']), info['image_count'], info.get('manifest_fingerprint')]
+         for slug, info in discovered_folders.items()],
+        asset_map,
+        templates_fingerprint(),
+        INLINE_CRITICAL_CSS and CRITICAL_FOLD_CHARS
+    )
+    if output_is_current(build_cache, index_file, fingerprint):
+        print("  = index.html unchanged\n")
+        return
+
     site_content = metadata_config.get("siteContent", {})
     site_settings = metadata_config.get("siteSettings", {})
     projects_meta = metadata_config.get("projects", {})
@@ -670,7 +2282,6 @@ def generate_index_html(discovered_folders, metadata_config):
 
     template = site_settings.get("template", "default")
     layout = site_settings.get("layout", "default")
-    version_suffix = f'?v={ASSET_VERSION}'
 
     # Extract content sections
     hero = site_content.get("hero", {})
@@ -692,7 +2303,7 @@ def generate_index_html(discovered_folders, metadata_config):
         if slug in discovered_folders:
             info = discovered_folders[slug]
             meta = projects_meta.get(slug) or get_project_metadata(slug, projects_meta, defaults)
-            card = generate_featured_card(slug, info, meta, is_first=(len(featured_cards) == 0))
+            card = featured_card_context(slug, info, meta, is_first=(len(featured_cards) == 0))
             featured_cards.append(card)
             processed_slugs.add(slug)
 
@@ -703,7 +2314,7 @@ def generate_index_html(discovered_folders, metadata_config):
         meta = projects_meta.get(slug) or get_project_metadata(slug, projects_meta, defaults)
         project_meta = projects_meta.get(slug, {})
         is_featured = project_meta.get('featured', False)
-        card = generate_featured_card(slug, info, meta, is_first=False)
+        card = featured_card_context(slug, info, meta, is_first=False)
 
         if is_featured:
             featured_cards.append(card)
@@ -713,178 +2324,41 @@ def generate_index_html(discovered_folders, metadata_config):
     # Combine: featured first, then non-featured
     all_cards = featured_cards + non_featured_cards
 
-    featured_cards_html = '\n\n'.join(all_cards) if all_cards else ''
-
     # Calculate stats for Instagram profile header
     total_projects = len(discovered_folders)
     total_images = sum(info['image_count'] for info in discovered_folders.values())
 
-    # Generate timeline milestones
-    milestones_html = []
-    for milestone in timeline.get("milestones", []):
-        focus_pills = '\n                        '.join(
-            f'<span class="milestone-pill">{area}</span>'
-            for area in milestone.get("focusAreas", [])
-        )
-
-        links_html = '\n                        '.join(
-            f'<a href="projects/{link["project"]}.html" class="milestone-link">{link["label"]}</a>'
-            for link in milestone.get("links", [])
-        )
-
-        milestones_html.append(f'''            <article class="milestone">
-                <span class="milestone-dot" aria-hidden="true"></span>
-                <span class="milestone-year">{milestone.get("year", "")}</span>
-                <div class="milestone-card">
-                    <h3>{milestone.get("title", "")}</h3>
-                    <p>{milestone.get("description", "")}</p>
-                    <p class="milestone-label">Focus Areas</p>
-                    <div class="milestone-pill-group">
-                        {focus_pills}
-                    </div>
-                    <p class="milestone-label">Project Galleries</p>
-                    <div class="milestone-links">
-                        {links_html}
-                    </div>
-                </div>
-            </article>''')
-
-    timeline_html = '\n\n'.join(milestones_html)
-
-    # Generate about paragraphs (supports both legacy and Editor.js block format)
+    # About blocks are already HTML (supports both legacy and Editor.js block format)
     about_blocks = about.get("blocks", [])
     if about_blocks:
         # Editor.js block format
-        about_paragraphs = '\n                    '.join(
-            render_editorjs_block(block) for block in about_blocks
-        )
+        about_html = [render_editorjs_block(block) for block in about_blocks]
     else:
         # Legacy paragraph array format
-        about_paragraphs = '\n                    '.join(
-            f'<p>{p}</p>' for p in about.get("paragraphs", [])
-        )
-
-    # Generate skills
-    skills_html = '\n                        '.join(
-        f'<div class="skill">{skill}</div>' for skill in about.get("skills", [])
-    )
-
-    # Generate contact links
-    def make_contact_link(link):
-        target = 'target="_blank"' if not link["url"].startswith("mailto:") else ""
-        return f'<a href="{link["url"]}" class="contact-button" {target}>{link["label"]}</a>'
-    contact_links = '\n                '.join(
-        make_contact_link(link) for link in contact.get("links", [])
+        about_html = [f'<p>{p}</p>' for p in about.get("paragraphs", [])]
+
+    html = render_template(
+        'index.html',
+        site_content=site_content,
+        hero=hero,
+        featured_section=featured_section,
+        timeline=timeline,
+        about=about,
+        about_html=about_html,
+        contact=contact,
+        footer=footer,
+        cards=all_cards,
+        total_projects=total_projects,
+        total_images=total_images,
+        layout=layout,
+        theme=template,
+        style_head=site_style_head(layout, template, site_settings.get("liveSwitch", False))
     )
 
-    # Generate YouTube social pill
-    youtube = hero.get("social", {}).get("youtube", {})
-    youtube_html = ""
-    if youtube.get("url"):
-        youtube_html = f'''<a href="{youtube["url"]}" target="_blank" rel="noreferrer" class="social-pill youtube" aria-label="Watch on YouTube">
-                    <svg viewBox="0 0 24 24" aria-hidden="true" focusable="false">
-                        <path d="M23.5 6.2a3 3 0 0 0-2.1-2.1C19.4 3.6 12 3.6 12 3.6s-7.4 0-9.4.5A3 3 0 0 0 .5 6.2 31.7 31.7 0 0 0 0 12a31.7 31.7 0 0 0 .5 5.8 3 3 0 0 0 2.1 2.1c2 .5 9.4.5 9.4.5s7.4 0 9.4-.5a3 3 0 0 0 2.1-2.1 31.7 31.7 0 0 0 .5-5.8 31.7 31.7 0 0 0-.5-5.8Z" fill="#ff0000"/>
-                        <path d="m9.75 8.7 6.2 3.3-6.2 3.3Z" fill="#fff"/>
-                    </svg>
-                    <span>{youtube.get("label", "@reyanmakes")}</span>
-                </a>'''
-
-    html = f'''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{site_content.get("siteTitle", "Reyan Makes")}</title>
-    <meta name="description" content="{site_content.get("siteDescription", "")}">
-    <link rel="stylesheet" href="styles.css{version_suffix}">
-    <script src="config-loader.js"></script>
-</head>
-<body>
-    <nav class="navbar">
-        <div class="nav-container">
-            <a href="index.html" class="logo">{site_content.get("siteName", "Reyan Makes")}</a>
-            <ul class="nav-menu">
-                <li><a href="#featured" class="nav-link">Featured</a></li>
-                <li><a href="#timeline" class="nav-link">Journey</a></li>
-                <li><a href="#contact" class="nav-link">Contact</a></li>
-            </ul>
-        </div>
-    </nav>
-
-    <section id="home" class="hero">
-        <div class="hero-content">
-            <div class="profile-avatar">R</div>
-            <h1 class="hero-title">{hero.get("title", "")}</h1>
-            <p class="hero-subtitle">{hero.get("subtitle", "")}</p>
-            <div class="profile-stats">
-                <div class="stat"><span class="stat-value">{total_projects}</span><span class="stat-label">projects</span></div>
-                <div class="stat"><span class="stat-value">{total_images}</span><span class="stat-label">images</span></div>
-            </div>
-            <div class="hero-about">
-                {about_paragraphs}
-            </div>
-            <div class="hero-skills">
-                <h3>{about.get("skillsTitle", "Skills & Experience")}</h3>
-                <div class="skills-grid">
-                    {skills_html}
-                </div>
-            </div>
-            <div class="hero-actions">
-                {youtube_html}
-                <a href="{hero.get("ctaLink", "#featured")}" class="cta-button">{hero.get("ctaText", "Explore My Work")}</a>
-            </div>
-        </div>
-    </section>
-
-    <section id="featured" class="featured-projects">
-        <div class="container">
-            <h2 class="section-title">{featured_section.get("title", "Featured Builds")}</h2>
-            <p class="section-subtitle">{featured_section.get("subtitle", "")}</p>
-
-            <div class="projects-grid">
-{featured_cards_html}
-
-            </div>
-        </div>
-    </section>
-
-    <section id="timeline" class="timeline timeline--glow">
-        <div class="container">
-            <h2 class="section-title">{timeline.get("title", "My Maker Journey")}</h2>
-            <p class="section-subtitle">{timeline.get("subtitle", "")}</p>
-        </div>
-
-        <div class="journey-track">
-{timeline_html}
-        </div>
-    </section>
-
-    <section id="contact" class="contact">
-        <div class="container">
-            <h2 class="section-title">{contact.get("title", "Let's Connect")}</h2>
-            <p class="contact-description">{contact.get("description", "")}</p>
-            <div class="contact-links">
-                {contact_links}
-            </div>
-        </div>
-    </section>
-
-    <footer class="footer">
-        <div class="container">
-            <p>{footer.get("copyright", "&copy; 2025 Reyan Bhattacharjee | Built with passion")}</p>
-        </div>
-    </footer>
-
-    <script src="script.js{version_suffix}"></script>
-    <script src="edit-mode.js{version_suffix}"></script>
-</body>
-</html>
-'''
-
     # Write the generated index.html
-    index_file = BASE_DIR / 'index.html'
-    with open(index_file, 'w', encoding='utf-8') as f:
-        f.write(html)
+    html = inline_critical_css(html, 'index.html')
+    write_output(index_file, html)
+    record_output(build_cache, index_file, fingerprint)
 
     print(f"  + Generated index.html with {len(featured_cards)} featured projects")
     print(f"  + Theme: {template}, Layout: {layout}")
@@ -932,17 +2406,15 @@ def update_index_featured(discovered_folders, metadata_config):
     for i, (slug, info, meta) in enumerate(featured_projects):
         cards_html.append(generate_featured_card(slug, info, meta, is_first=(i == 0)))
 
+    # Each card ends with a newline; the template puts a blank line after each
     featured_section = '''            <div class="projects-grid">
-''' + '\n\n'.join(cards_html) + '''
-
-            </div>'''
+''' + ''.join(card + '\n' for card in cards_html) + '''            </div>'''
 
     # Read current index.html
     with open(index_file, 'r') as f:
         content = f.read()
 
     # Find and replace the projects-grid section
-    import re
     pattern = r'<div class="projects-grid">.*?</div>\s*</div>\s*</section>\s*<section id="timeline"'
     replacement = featured_section + '''
         </div>
@@ -953,8 +2425,7 @@ def update_index_featured(discovered_folders, metadata_config):
     new_content = re.sub(pattern, replacement, content, flags=re.DOTALL)
 
     if new_content != content:
-        with open(index_file, 'w', encoding='utf-8') as f:
-            f.write(new_content)
+        write_output(index_file, new_content)
         print(f"\n  + Updated index.html with {len(featured_projects)} featured projects\n")
     else:
         print("\n  No changes needed to index.html\n")
@@ -964,8 +2435,8 @@ def update_index_featured(discovered_folders, metadata_config):
 # STEP 7: GENERATE SITE CONFIG
 # ============================================================================
 
-def generate_site_config(metadata_config):
-    """Generate site-config.json for dynamic CSS loading"""
+def generate_site_config(metadata_config, build_cache=None):
+    """Generate site-config.json (used by the admin panel and the opt-in live switcher)"""
     print("Generating site config...\n")
 
     site_settings = metadata_config.get("siteSettings", {})
@@ -974,21 +2445,477 @@ def generate_site_config(metadata_config):
         "layout": site_settings.get("layout", "default"),
         "theme": site_settings.get("template", "default")
     }
+    # Fingerprinted stylesheet URLs (relative to the site root) for config-loader.js
+    config["layoutHref"] = asset_map.get(f"layouts/{config['layout']}.css", f"layouts/{config['layout']}.css")
+    config["themeHref"] = asset_map.get(f"themes/{config['theme']}.css", f"themes/{config['theme']}.css")
 
     config_file = BASE_DIR / 'site-config.json'
-    with open(config_file, 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=2)
+    fingerprint = inputs_fingerprint(config)
+    if output_is_current(build_cache, config_file, fingerprint):
+        print(f"  = site-config.json unchanged: layout={config['layout']}, theme={config['theme']}\n")
+        return config
+
+    write_output(config_file, json.dumps(config, indent=2))
+    record_output(build_cache, config_file, fingerprint)
 
     print(f"  + site-config.json: layout={config['layout']}, theme={config['theme']}\n")
     return config
 
 
+# ============================================================================
+# STEP 8: PRECOMPRESS TEXT ARTIFACTS
+# ============================================================================
+
+def precompress_encoders():
+    """(extension, compress function) for each available precompression"""
+    encoders = [('gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append(('br', lambda data: brotli.compress(data, quality=11)))
+    return encoders
+
+
+def precompress_outputs(build_cache):
+    """
+    Write .gz (and .br, with the brotli package) siblings for every text artifact
+    Files whose content hash is unchanged since the last build are skipped, and
+    siblings of files that no longer exist are removed
+    """
+    print("Precompressing text artifacts...\n")
+
+    encoders = precompress_encoders()
+    cached = build_cache.setdefault('compressed', {})
+    seen = {}
+    totals = {}  # suffix -> [files, original bytes, bytes per encoding]
+    written = 0
+
+    artifacts = sorted({path for pattern in PRECOMPRESS_PATTERNS for path in BASE_DIR.glob(pattern)
+                        if path.is_file() and path.stat().st_size >= PRECOMPRESS_MIN_BYTES})
+    for path in artifacts:
+        key = path.relative_to(BASE_DIR).as_posix()
+        digest = file_digest(path)
+        siblings = [(ext, func, path.with_name(f"{path.name}.{ext}")) for ext, func in encoders]
+
+        entry = cached.get(key)
+        if not (entry and entry['digest'] == digest and all(sibling.exists() for _, _, sibling in siblings)):
+            data = path.read_bytes()
+            entry = {"digest": digest, "size": len(data), "compressed": {}}
+            for ext, func, sibling in siblings:
+                compressed = func(data)
+                write_output(sibling, compressed)
+                entry['compressed'][ext] = len(compressed)
+            written += 1
+        seen[key] = entry
+
+        total = totals.setdefault(path.suffix, [0, 0, {}])
+        total[0] += 1
+        total[1] += entry['size']
+        for ext, size in entry['compressed'].items():
+            total[2][ext] = total[2].get(ext, 0) + size
+
+    # Siblings of artifacts that are gone (e.g. pages of removed projects)
+    for key in cached.keys() - seen.keys():
+        for ext, _ in encoders:
+            (BASE_DIR / f"{key}.{ext}").unlink(missing_ok=True)
+    build_cache['compressed'] = seen
+
+    for suffix, (count, size, compressed) in sorted(totals.items()):
+        ratios = ', '.join(f"{ext} {format_bytes(num_bytes)} ({num_bytes / size:.0%})"
+                           for ext, num_bytes in compressed.items())
+        print(f"  {suffix:<6} {count:>4} files  {format_bytes(size):>9} -> {ratios}")
+    if brotli is None:
+        print("  (install the brotli package for .br siblings)")
+    print(f"\n  Compressed {written} of {len(artifacts)} artifacts ({len(artifacts) - written} unchanged)\n")
+
+
+# ============================================================================
+# WATCH MODE
+# ============================================================================
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """
+    Linux inotify (through ctypes, no extra packages): one watch per folder
+    under images/, added as folders appear, plus the base folder for the
+    JSON config files
+    changes() returns the image folders to rescan and config files that changed
+    """
+
+    def __init__(self, images_base, config_files):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.images_base = images_base
+        self.config_files = set(config_files)
+        self.paths = {}     # watch descriptor -> folder
+        self.add_tree(images_base)
+        self.config_wd = self.add_watch(BASE_DIR, IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE)
+
+    def add_watch(self, path, mask):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask | IN_ONLYDIR)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                raise OSError(error, "inotify watch limit reached (fs.inotify.max_user_watches)")
+            return None     # Gone again already; its parent's event covers it
+        self.paths[wd] = path
+        return wd
+
+    def add_tree(self, path):
+        """Watch a folder and every folder below it"""
+        if self.add_watch(path, IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE) is None:
+            return
+        try:
+            with os.scandir(path) as entries:
+                subdirs = [entry.name for entry in entries
+                           if entry.is_dir(follow_symlinks=False) and entry.name not in EXCLUDE_FOLDERS]
+        except OSError:
+            return
+        for name in subdirs:
+            self.add_tree(path / name)
+
+    def drop_tree(self, path):
+        """Stop watching a folder moved away (its watches would follow it)"""
+        for wd, folder in list(self.paths.items()):
+            if folder == path or path in folder.parents:
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.paths[wd]
+
+    def changes(self, timeout=None):
+        """Changed paths, waiting up to timeout seconds (None: until there are some)"""
+        changed = set()
+        # Events for other files in the base folder (index.html etc.) don't count
+        while not changed:
+            if not select.select([self.fd], [], [], timeout)[0]:
+                break
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            self.read_events(data, changed)
+            if timeout is not None:
+                break
+        return changed
+
+    def read_events(self, data, changed):
+        """Add the paths a buffer of inotify events touches to changed"""
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: rescan everything
+                changed.add(self.images_base)
+                continue
+            folder = self.paths.get(wd)
+            if folder is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.paths[wd]
+            elif wd == self.config_wd:
+                if folder / name in self.config_files:
+                    changed.add(folder / name)
+            elif mask & IN_ISDIR:
+                path = folder / name
+                if mask & IN_MOVED_FROM:
+                    self.drop_tree(path)
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    self.add_tree(path)
+                # A folder coming or going is rescanned (with anything below it)
+                changed.add(path)
+            else:
+                changed.add(folder)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Fallback where inotify is unavailable: compares a snapshot of every
+    folder's files (size and mtime) under images/ and of the config files
+    every WATCH_POLL_INTERVAL seconds
+    """
+
+    def __init__(self, images_base, config_files):
+        self.images_base = images_base
+        self.config_files = set(config_files)
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self):
+        snapshot = {}
+        for dirpath, dirnames, filenames in os.walk(self.images_base):
+            dirnames[:] = [name for name in dirnames if name not in EXCLUDE_FOLDERS]
+            files = {}
+            for name in filenames:
+                try:
+                    stat = os.stat(os.path.join(dirpath, name))
+                except OSError:
+                    continue
+                files[name] = (stat.st_size, stat.st_mtime_ns)
+            snapshot[Path(dirpath)] = files
+        for path in self.config_files:
+            try:
+                stat = path.stat()
+                snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                snapshot[path] = None
+        return snapshot
+
+    def changes(self, timeout=None):
+        """Changed paths, waiting up to timeout seconds (None: until there are some)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = WATCH_POLL_INTERVAL if deadline is None else max(0, deadline - time.monotonic())
+            time.sleep(min(remaining, WATCH_POLL_INTERVAL))
+            snapshot = self.take_snapshot()
+            changed = {path for path in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        pass
+
+
+def file_watcher(images_base, config_files):
+    """An InotifyWatcher where the platform has inotify, otherwise a PollingWatcher"""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(images_base, config_files)
+        except (OSError, AttributeError) as e:
+            print(f"  inotify unavailable ({e}); polling every {WATCH_POLL_INTERVAL}s instead")
+    return PollingWatcher(images_base, config_files)
+
+
+def collect_changes(watcher):
+    """
+    Block until something changes, then keep collecting until WATCH_DEBOUNCE
+    seconds pass without another change (or WATCH_MAX_DELAY runs out)
+    Returns (changed paths, perf_counter time of the first change)
+    """
+    changed = watcher.changes()
+    first = time.perf_counter()
+    while time.perf_counter() - first < WATCH_MAX_DELAY:
+        more = watcher.changes(WATCH_DEBOUNCE)
+        if not more:
+            break
+        changed |= more
+    return changed, first
+
+
+def forget_image_folder(slug, info, discovered, build_cache):
+    """Drop a gallery whose folder is gone (its generated files stay, as in a full build)"""
+    print(f"  - {info['rel_path']}: no longer has images")
+    del discovered[slug]
+    manifest_registry.pop(slug, None)
+    build_cache.get('slugs', {}).pop(slug, None)
+    rel_path = info['rel_path'].as_posix()
+    build_cache['thumbnails'] = {key: entry for key, entry in build_cache['thumbnails'].items()
+                                 if (os.path.dirname(key) or '.') != rel_path}
+
+
+def rebuild_changes(changed, state, jobs=1):
+    """
+    Bring the outputs up to date with a batch of changed paths, using the warm
+    state from build(): only galleries whose images, order, hidden images or
+    metadata changed get their thumbnails, manifest and page rebuilt
+    Rewritten files lose their precompressed siblings, which watch() writes anew on exit
+    Returns True if anything was rebuilt
+    """
+    discovered = state['discovered']
+    build_cache = state['build_cache']
+    affected = set()
+    removed = False
+
+    # Config files: reload and work out which galleries they touch
+    metadata_changed = False
+    for path, key, loader in ((METADATA_FILE, 'metadata_config', load_metadata),
+                              (IMAGE_ORDER_FILE, 'image_orders', load_image_orders),
+                              (HIDDEN_IMAGES_FILE, 'hidden_images', load_hidden_images)):
+        if path not in changed:
+            continue
+        try:
+            loaded = loader()
+        except ValueError as e:
+            # Most likely read mid-save; the save completing triggers another rebuild
+            print(f"  Warning: could not read {path.name} ({e}); keeping the previous version")
+            continue
+        previous, state[key] = state[key], loaded
+        if loaded == previous:
+            continue
+        print(f"  ~ {path.name}")
+        if key == 'metadata_config':
+            # Titles, defaults and site settings can feed every page
+            metadata_changed = True
+            affected.update(discovered)
+        else:
+            affected.update(slug for slug in previous.keys() | loaded.keys()
+                            if slug in discovered and previous.get(slug) != loaded.get(slug))
+
+    # Image folders: rescan the outermost changed ones (scans recurse)
+    rescan = []
+    for folder in sorted(path for path in changed if path == IMAGES_BASE or IMAGES_BASE in path.parents):
+        if not any(folder == outer or outer in folder.parents for outer in rescan):
+            rescan.append(folder)
+    def rescanned(path):
+        return any(path == folder or folder in path.parents for folder in rescan)
+
+    # Removals first, so a slug freed in one folder can be taken up by another
+    scans = [dict(iter_image_folders(IMAGES_BASE, folder)) for folder in rescan]
+    for slug, info in list(discovered.items()):
+        if rescanned(info['path']) and not any(slug in found for found in scans):
+            forget_image_folder(slug, info, discovered, build_cache)
+            removed = True
+    for found in scans:
+        for slug, info in found.items():
+            previous = discovered.get(slug)
+            if previous and previous['path'] == info['path'] and previous['files'] == info['files']:
+                continue
+            # Another folder outside this rescan still owns the slug: as in a
+            # full build, the one seen last keeps it and this one stays out
+            if previous and previous['path'] != info['path'] and not rescanned(previous['path']):
+                continue
+            discovered[slug] = info
+            affected.add(slug)
+
+    # A removed gallery may have been shadowing a folder with the same slug
+    if removed:
+        for slug, info in iter_image_folders(IMAGES_BASE):
+            if slug not in discovered:
+                discovered[slug] = info
+                affected.add(slug)
+
+    if not (affected or removed or metadata_changed):
+        return False
+
+    metadata_config = state['metadata_config']
+    if affected:
+        build_galleries(IMAGES_BASE, metadata_config, state['image_orders'], state['hidden_images'],
+                        build_cache, jobs=jobs, folders=[(slug, discovered[slug]) for slug in sorted(affected)])
+
+    # Site-wide outputs; each is skipped when its inputs came out the same
+    generate_site_index(discovered, metadata_config, build_cache)
+    generate_index_html(discovered, metadata_config, build_cache)
+    if metadata_changed:
+        generate_site_config(metadata_config, build_cache)
+    save_build_cache(build_cache)
+    return True
+
+
+def watch(args):
+    """
+    Build once, then rebuild whatever changes under images/ or in the config files
+    Brotli at full quality would dominate a single-image rebuild, so rebuilt
+    files go without precompressed siblings (write_output() removes the stale
+    ones) until watching stops and they are written again
+    """
+    global sheet_tile_cache
+    sheet_tile_cache = {}
+    state = {}
+    status = build(args, state)
+    if not state:
+        return status
+
+    watcher = file_watcher(IMAGES_BASE, (METADATA_FILE, IMAGE_ORDER_FILE, HIDDEN_IMAGES_FILE))
+    print(f"Watching {IMAGES_BASE.relative_to(BASE_DIR)}/ and the config files "
+          f"({type(watcher).__name__}); Ctrl+C to stop\n")
+    stale_siblings = False
+    try:
+        while True:
+            changed, first = collect_changes(watcher)
+            build_report.reset(slowest=args.slowest)
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {len(changed)} changed paths\n")
+            try:
+                rebuilt = rebuild_changes(changed, state, jobs=args.jobs)
+            except Exception as e:
+                print(f"\nREBUILD FAILED: {e}")
+                import traceback
+                traceback.print_exc()
+                continue
+            stale_siblings |= rebuilt
+            if rebuilt:
+                print(f"Rebuilt in {(time.perf_counter() - first) * 1000:.0f} ms from the first change "
+                      f"(including {WATCH_DEBOUNCE * 1000:.0f} ms debounce)\n")
+            else:
+                print("  Nothing to rebuild\n")
+    except KeyboardInterrupt:
+        print("\nStopped watching\n")
+        if PRECOMPRESS and stale_siblings:
+            precompress_outputs(state['build_cache'])
+            save_build_cache(state['build_cache'])
+        return 0
+    finally:
+        watcher.close()
+
+
 # ============================================================================
 # MAIN ORCHESTRATION
 # ============================================================================
 
-def main():
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Build the Reyan Makes site from the images folder")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="worker processes for thumbnail generation (default: CPU count)")
+    parser.add_argument('--force', action='store_true',
+                        help="rewrite manifests and pages even if their inputs are unchanged")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"write a cProfile dump of the main process to {BUILD_PROFILE_FILE.relative_to(BASE_DIR)}")
+    parser.add_argument('--slowest', type=int, default=10, metavar='N',
+                        help="number of slowest images listed in the build report (default: 10)")
+    parser.add_argument('--watch', action='store_true',
+                        help="after building, keep watching images/ and the JSON config files "
+                             "and rebuild only what changes")
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    return args
+
+
+def main(argv=None):
     """Main build process"""
+    args = parse_args(argv)
+    build_report.reset(slowest=args.slowest)
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    try:
+        return watch(args) if args.watch else build(args)
+    finally:
+        if profiler:
+            profiler.disable()
+            BUILD_PROFILE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(BUILD_PROFILE_FILE)
+            print(f"Profile written to {BUILD_PROFILE_FILE.relative_to(BASE_DIR)} "
+                  f"(view with: python3 -m pstats {BUILD_PROFILE_FILE.relative_to(BASE_DIR)})\n")
+
+
+def build(args, state=None):
+    """
+    Run every build stage
+    With a state dict, the loaded config, build cache and discovered folders
+    are left in it for --watch to rebuild from
+    """
     print("=" * 70)
     print("REYAN MAKES - AUTOMATED SITE BUILDER")
     print("=" * 70)
@@ -998,48 +2925,77 @@ def main():
     GEN_BASE.mkdir(exist_ok=True)
     THUMBNAILS_BASE.mkdir(exist_ok=True)
     MANIFESTS_BASE.mkdir(exist_ok=True)
+    reset_templates()
+    manifest_registry.clear()
 
     try:
-        # Load metadata
-        print("Loading project metadata...\n")
-        metadata_config = load_metadata()
-        print(f"  + Loaded {len(metadata_config.get('projects', {}))} project metadata entries\n")
-
-        # Load custom image orders
-        image_orders = load_image_orders()
-        if image_orders:
-            print(f"  + Loaded custom image orders for {len(image_orders)} projects\n")
-
-        # Load hidden images
-        hidden_images = load_hidden_images()
-        if hidden_images:
-            total_hidden = sum(len(v) for v in hidden_images.values())
-            print(f"  + Loaded {total_hidden} hidden images across {len(hidden_images)} projects\n")
-
-        # Step 1: Discover all image folders
-        discovered = discover_image_folders(IMAGES_BASE)
+        with build_report.stage('load metadata'):
+            # Load metadata
+            print("Loading project metadata...\n")
+            metadata_config = load_metadata()
+            print(f"  + Loaded {len(metadata_config.get('projects', {}))} project metadata entries\n")
+
+            # Load custom image orders
+            image_orders = load_image_orders()
+            if image_orders:
+                print(f"  + Loaded custom image orders for {len(image_orders)} projects\n")
+
+            # Load hidden images
+            hidden_images = load_hidden_images()
+            if hidden_images:
+                total_hidden = sum(len(v) for v in hidden_images.values())
+                print(f"  + Loaded {total_hidden} hidden images across {len(hidden_images)} projects\n")
+
+            build_cache = load_build_cache()
+            if args.force:
+                build_cache['outputs'] = {}
+
+        # Hashed CSS/JS names must be known before any page is written
+        with build_report.stage('assets'):
+            fingerprint_assets()
+
+        # Steps 1-4: Discover folders and stream each through thumbnails
+        # (skipping unchanged content), manifest and project page
+        with build_report.stage('galleries'):
+            discovered = build_galleries(IMAGES_BASE, metadata_config, image_orders, hidden_images,
+                                         build_cache, jobs=args.jobs)
+            save_build_cache(build_cache)
+
+        if state is not None:
+            state.update(metadata_config=metadata_config, image_orders=image_orders,
+                         hidden_images=hidden_images, build_cache=build_cache, discovered=discovered)
 
         if not discovered:
             print("\nWarning: No image folders found! Check your images directory.")
             return 1
 
-        # Step 2: Generate thumbnails
-        generate_all_thumbnails(discovered)
-
-        # Step 3: Generate manifests (with custom image orders and hidden images)
-        generate_all_manifests(discovered, image_orders, hidden_images)
-
-        # Step 4: Generate project pages
-        generate_all_project_pages(discovered, metadata_config)
-
         # Step 5: Generate site index
-        site_index = generate_site_index(discovered, metadata_config)
+        with build_report.stage('site index'):
+            site_index = generate_site_index(discovered, metadata_config, build_cache)
 
         # Step 6: Generate index.html from configuration
-        generate_index_html(discovered, metadata_config)
+        with build_report.stage('index.html'):
+            generate_index_html(discovered, metadata_config, build_cache)
 
         # Step 7: Generate site config for dynamic CSS loading
-        generate_site_config(metadata_config)
+        with build_report.stage('site config'):
+            generate_site_config(metadata_config, build_cache)
+
+        # Step 8: Precompressed siblings for the text outputs
+        if PRECOMPRESS:
+            with build_report.stage('precompress'):
+                precompress_outputs(build_cache)
+
+        with build_report.stage('save cache'):
+            # Forget outputs that no longer exist (e.g. removed projects)
+            build_cache['outputs'] = {key: entry for key, entry in build_cache['outputs'].items()
+                                      if (BASE_DIR / key).exists()}
+            save_build_cache(build_cache)
+
+        report_file = build_report.write()
+        print("Build report:\n")
+        print(build_report.summary())
+        print(f"\n  + Written to {report_file.relative_to(BASE_DIR)}\n")
 
         print("=" * 70)
         print("BUILD COMPLETE!")
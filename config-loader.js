@@ -1,5 +1,7 @@
-// Synchronous site config loader - prevents flash of unstyled content
-// This script should be in <head> and loads CSS before page renders
+// Live layout/theme switcher - only included when siteSettings.liveSwitch is on
+// Pages ship with their layout/theme stylesheets and body classes baked in at
+// build time; this checks site-config.json in the background (never blocking
+// rendering) and swaps them if the site config has changed since the build
 (function() {
     'use strict';
 
@@ -8,40 +10,34 @@
     const isProjectPage = path.includes('/projects/');
     const prefix = isProjectPage ? '../' : '';
 
-    // Synchronous XHR to load config (blocking intentionally to prevent FOUC)
-    try {
-        const xhr = new XMLHttpRequest();
-        xhr.open('GET', prefix + 'site-config.json', false); // false = synchronous
-        xhr.send(null);
+    function applyStyle(kind, name, href) {
+        if (!name) return;
 
-        if (xhr.status === 200) {
-            const config = JSON.parse(xhr.responseText);
-            const timestamp = Date.now();
-
-            // Inject layout CSS
-            if (config.layout) {
-                document.write('<link rel="stylesheet" href="' + prefix + 'layouts/' + config.layout + '.css?v=' + timestamp + '">');
-                // Store for body class
-                window.__siteLayout = config.layout;
-            }
-
-            // Inject theme CSS
-            if (config.theme) {
-                document.write('<link rel="stylesheet" href="' + prefix + 'themes/' + config.theme + '.css?v=' + timestamp + '">');
-                window.__siteTheme = config.theme;
-            }
+        // Stylesheet links are tagged data-site-layout / data-site-theme by the builder
+        let link = document.querySelector('link[data-site-' + kind + ']');
+        if (link && link.getAttribute('data-site-' + kind) === name) return;
+        if (!link) {
+            link = document.createElement('link');
+            link.rel = 'stylesheet';
+            document.head.appendChild(link);
         }
-    } catch (e) {
-        console.warn('Could not load site config:', e);
+        link.href = prefix + href;
+        link.setAttribute('data-site-' + kind, name);
+
+        // Swap the body class to match
+        Array.from(document.body.classList)
+            .filter(cls => cls.startsWith(kind + '-'))
+            .forEach(cls => document.body.classList.remove(cls));
+        document.body.classList.add(kind + '-' + name);
     }
 
-    // Add body classes when DOM is ready
-    document.addEventListener('DOMContentLoaded', function() {
-        if (window.__siteLayout) {
-            document.body.classList.add('layout-' + window.__siteLayout);
-        }
-        if (window.__siteTheme) {
-            document.body.classList.add('theme-' + window.__siteTheme);
-        }
-    });
+    fetch(prefix + 'site-config.json', { cache: 'no-cache' })
+        .then(response => response.ok ? response.json() : null)
+        .then(config => {
+            if (!config) return;
+            // Content-hashed URLs when the build provides them
+            applyStyle('layout', config.layout, config.layoutHref || 'layouts/' + config.layout + '.css');
+            applyStyle('theme', config.theme, config.themeHref || 'themes/' + config.theme + '.css');
+        })
+        .catch(e => console.warn('Could not load site config:', e));
 })();